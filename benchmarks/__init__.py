@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for the logkit hot paths. Run them with: python -m benchmarks.run
+"""
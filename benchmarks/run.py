@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Runs the logkit benchmarks, and writes the results as JSON so that versions can be compared.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+    python -m benchmarks.run --filter pulse --quick
+
+Each benchmark is run several times, and the fastest run is reported as the time per operation.
+The allocation cases are traced with tracemalloc, and report the peak memory allocated during a
+single call, and the memory still held after it.
+The logger is configured in a temporary directory, and console output is sent to /dev/null.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+BENCHMARKS = {}
+ALLOCATION_CASES = {}
+BENCHMARK_ENV = """
+FILE_LOGGER__ACTIVE=False
+SOCKET_LOGGER__ACTIVE=False
+CONSOLE_LOG_LEVEL=INFO
+FILE_LOG_LEVEL=INFO
+HUMAN_MODE=True
+WITH_COLOR=True
+WITH_LEVEL_PREFIX=False
+"""
+
+SAMPLE_DATA = {"greeting_count": 1, "schmeckles": [1, 2, 3], "lang": "EN"}
+
+
+def benchmark(name: str, n: int):
+    """ Register a benchmark. The function runs n operations, and returns the seconds they took. """
+    def decorator(func: Callable):
+        BENCHMARKS[name] = (func, n)
+        return func
+    return decorator
+
+
+# ======================================================================================================================
+# Logger state.
+# ======================================================================================================================
+
+
+def get_logger():
+    from logkit.logger import Logger
+    return Logger.get_instance()
+
+
+@contextlib.contextmanager
+def logger_state(human_mode: bool=True, console_log_level: int=logging.INFO, file_path: str=None,
+                 socket_logger=None):
+    """ Temporarily re-configure the logger singleton for one benchmark. """
+    logger = get_logger()
+    saved = (logger.human_mode, logger.console_log_level, logger.file_logger, logger.file_logging_map,
+             logger.file_sink, logger.socket_logger, logger.native_logger.handlers[:], logger.native_logger.level)
+
+    logger.human_mode = human_mode
+    logger.console_log_level = console_log_level
+    logger.socket_logger = socket_logger
+
+    devnull = open(os.devnull, "w")
+    if not human_mode:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(logging.Formatter(logger.RECORD_FMT))
+        logger.native_logger.handlers = [handler]
+        logger.native_logger.propagate = False
+        logger.native_logger.setLevel(console_log_level)
+
+    if file_path is not None:
+        logger.set_file_logger(logging.getLogger("logkit_benchmark_file_logger"))
+        logger.file_logger.handlers = []
+        logger.file_logger.propagate = False
+        logger._attach_file_logger(file_path)
+    else:
+        logger.file_logger = None
+        logger.file_logging_map = {}
+        logger.file_sink = None
+
+    try:
+        with contextlib.redirect_stdout(devnull):
+            yield logger
+    finally:
+        if logger.file_logger is not None:
+            for handler in logger.file_logger.handlers:
+                handler.close()
+        (logger.human_mode, logger.console_log_level, logger.file_logger, logger.file_logging_map,
+         logger.file_sink, logger.socket_logger, logger.native_logger.handlers, level) = saved
+        logger.native_logger.setLevel(level)
+        devnull.close()
+
+
+# ======================================================================================================================
+# Benchmarks.
+# ======================================================================================================================
+
+
+@benchmark("disabled_level", n=20000)
+def bench_disabled_level(n: int):
+    from logkit import log
+    with logger_state(console_log_level=logging.INFO):
+        start = time.perf_counter()
+        for _ in range(n):
+            log.debug("Not shown", SAMPLE_DATA)
+        return time.perf_counter() - start
+
+
+@benchmark("write_human", n=5000)
+def bench_write_human(n: int):
+    from logkit import log
+    with logger_state(human_mode=True):
+        start = time.perf_counter()
+        for i in range(n):
+            log.info("Some Data", SAMPLE_DATA)
+        return time.perf_counter() - start
+
+
+@benchmark("write_native", n=5000)
+def bench_write_native(n: int):
+    from logkit import log
+    with logger_state(human_mode=False):
+        start = time.perf_counter()
+        for i in range(n):
+            log.info("Some Data", SAMPLE_DATA)
+        return time.perf_counter() - start
+
+
+@benchmark("recursive_data_render", n=20)
+def bench_recursive_data_render(n: int):
+    data = {"key_{}".format(i): {"nested_{}".format(j): j for j in range(10)} for i in range(200)}
+    with logger_state(human_mode=True) as logger:
+        start = time.perf_counter()
+        for _ in range(n):
+            logger.recursive_data_render(data, logging.INFO, indent=0, indent_end_stack=[], with_color=True)
+        return time.perf_counter() - start
+
+
+@benchmark("file_sink", n=5000)
+def bench_file_sink(n: int):
+    from logkit import log
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "logs", "bench.log")
+        with logger_state(console_log_level=logging.CRITICAL + 1, file_path=path):
+            start = time.perf_counter()
+            for i in range(n):
+                log.info("Some Data", SAMPLE_DATA)
+            return time.perf_counter() - start
+
+
+@benchmark("socket_tcp", n=5000)
+def bench_socket_tcp(n: int):
+    from logkit import log
+    from logkit.receiver import Receiver
+    from logkit.socket_logger import SocketLogger
+
+    receiver = Receiver(keep_records=False).start()
+    socket_logger = SocketLogger(port=receiver.address[1], max_queue_size=n)
+    try:
+        with logger_state(console_log_level=logging.CRITICAL + 1, socket_logger=socket_logger):
+            start = time.perf_counter()
+            for i in range(n):
+                log.info("Some Data", SAMPLE_DATA)
+            socket_logger.flush(timeout=30)
+            receiver.wait_for(n, timeout=30)
+            return time.perf_counter() - start
+    finally:
+        socket_logger.close()
+        receiver.stop()
+
+
+def batch_sinks(n: int, func: Callable) -> float:
+    """ Time the function with the file and TCP sinks on, and the console off, as in a batch job. """
+    from logkit.receiver import Receiver
+    from logkit.socket_logger import SocketLogger
+
+    receiver = Receiver(keep_records=False).start()
+    socket_logger = SocketLogger(port=receiver.address[1], max_queue_size=n)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "logs", "bench.log")
+            with logger_state(console_log_level=logging.CRITICAL + 1, file_path=path, socket_logger=socket_logger):
+                start = time.perf_counter()
+                func(n)
+                socket_logger.flush(timeout=30)
+                receiver.wait_for(n, timeout=30)
+                return time.perf_counter() - start
+    finally:
+        socket_logger.close()
+        receiver.stop()
+
+
+def batch_native(n: int, func: Callable) -> float:
+    """ Time the function with the plain (not human readable) console on. """
+    with logger_state(human_mode=False):
+        start = time.perf_counter()
+        func(n)
+        return time.perf_counter() - start
+
+
+def log_loop(n: int):
+    from logkit import log
+    for i in range(n):
+        log.info("Item", {"i": i})
+
+
+def log_batch(n: int):
+    from logkit import log
+    with log.batch() as batch:
+        for i in range(n):
+            batch.info("Item", {"i": i})
+
+
+@benchmark("batch_sinks_loop", n=5000)
+def bench_batch_sinks_loop(n: int):
+    return batch_sinks(n, log_loop)
+
+
+@benchmark("batch_sinks_write_many", n=5000)
+def bench_batch_sinks_write_many(n: int):
+    return batch_sinks(n, log_batch)
+
+
+@benchmark("batch_native_loop", n=5000)
+def bench_batch_native_loop(n: int):
+    return batch_native(n, log_loop)
+
+
+@benchmark("batch_native_write_many", n=5000)
+def bench_batch_native_write_many(n: int):
+    return batch_native(n, log_batch)
+
+
+@benchmark("pulse_increment_contention", n=200000)
+def bench_pulse_increment_contention(n: int, n_threads: int=4):
+    from logkit.pulse import Pulse
+    with logger_state():
+        pulse = Pulse("benchmark")
+
+    def work():
+        for _ in range(n // n_threads):
+            pulse.increment("detections")
+
+    threads = [threading.Thread(target=work) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+@benchmark("pulse_increment_labeled", n=200000)
+def bench_pulse_increment_labeled(n: int):
+    from logkit.pulse import Pulse, labels
+    with logger_state():
+        pulse = Pulse("benchmark_labeled")
+
+    label_sets = [{"code": code, "path": "/api/x"} for code in (200, 404, 500)]
+    interned = [labels(**label_set) for label_set in label_sets]
+    start = time.perf_counter()
+    for i in range(n // 2):
+        pulse.increment("http_requests", labels=label_sets[i % 3])
+        pulse.increment("http_requests", labels=interned[i % 3])
+    return time.perf_counter() - start
+
+
+def profiler_workload(n: int):
+    total = 0
+    for i in range(n):
+        total += sum(range(100))
+    return total
+
+
+@benchmark("profiler_off", n=20000)
+def bench_profiler_off(n: int):
+    start = time.perf_counter()
+    profiler_workload(n)
+    return time.perf_counter() - start
+
+
+@benchmark("profiler_100hz", n=20000)
+def bench_profiler_100hz(n: int):
+    from logkit.profiler import Profiler
+    with logger_state():
+        profiler = Profiler(rate_hz=100, report_interval=None).start()
+    try:
+        start = time.perf_counter()
+        profiler_workload(n)
+        return time.perf_counter() - start
+    finally:
+        profiler.stop()
+
+
+# ======================================================================================================================
+# Allocations.
+# ======================================================================================================================
+
+
+def allocation_case(name: str):
+    """ Register a single call to trace. The function takes the logger, and returns the call. """
+    def decorator(func: Callable):
+        ALLOCATION_CASES[name] = func
+        return func
+    return decorator
+
+
+@allocation_case("plain_message")
+def alloc_plain_message(logger):
+    from logkit import log
+    return lambda: log.info("Hello World!")
+
+
+@allocation_case("with_data")
+def alloc_with_data(logger):
+    from logkit import log
+    return lambda: log.info("Some Data", SAMPLE_DATA)
+
+
+@allocation_case("disabled_level")
+def alloc_disabled_level(logger):
+    from logkit import log
+    return lambda: log.debug("Not shown", SAMPLE_DATA)
+
+
+def measure_allocations(call: Callable, n: int) -> Dict:
+    # Warm up the caches first, so that they don't count as allocations.
+    for _ in range(10):
+        call()
+
+    # tracemalloc.reset_peak() is new in Python 3.9. Before that, the trace is restarted to reset the peak.
+    can_reset_peak = hasattr(tracemalloc, "reset_peak")
+
+    peaks = []
+    retained = 0
+    tracemalloc.start()
+    try:
+        for _ in range(n):
+            if can_reset_peak:
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.stop()
+                tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            call()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained += current - before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "n": n,
+        "peak_bytes_per_call": statistics.median(peaks),
+        "retained_bytes_per_call": retained / n,
+    }
+
+
+# ======================================================================================================================
+# Runner.
+# ======================================================================================================================
+
+
+def run_benchmark(func: Callable, n: int, repeat: int) -> Dict:
+    timings = [func(n) for _ in range(repeat)]
+    best = min(timings)
+    return {
+        "n": n,
+        "repeat": repeat,
+        "best_s": best,
+        "median_s": statistics.median(timings),
+        "ns_per_op": best / n * 1e9,
+        "ops_per_s": n / best if best > 0 else None,
+    }
+
+
+def compare(results: Dict, baseline: Dict):
+    print("{:<32} {:>14} {:>14} {:>9}".format("benchmark", "baseline ns", "current ns", "speedup"))
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print("{:<32} {:>14} {:>14.0f} {:>9}".format(name, "-", result["ns_per_op"], "-"))
+            continue
+        speedup = base["ns_per_op"] / result["ns_per_op"]
+        print("{:<32} {:>14.0f} {:>14.0f} {:>8.2f}x".format(name, base["ns_per_op"], result["ns_per_op"], speedup))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the logkit benchmarks.")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--compare", default=None, help="Compare against a previous JSON result file.")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="Run a tenth of the operations.")
+    args = parser.parse_args()
+
+    # Configure the logger from a temporary env file, so that no local logkit.env is touched.
+    working_directory = tempfile.mkdtemp(prefix="logkit_benchmark_")
+    with open(os.path.join(working_directory, "logkit.env"), "w") as f:
+        f.write(BENCHMARK_ENV)
+
+    original_directory = os.getcwd()
+    os.chdir(working_directory)
+    try:
+        get_logger()
+    finally:
+        os.chdir(original_directory)
+
+    import logkit
+    results = {
+        "version": logkit.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": {},
+        "allocations": {},
+    }
+
+    for name, (func, n) in BENCHMARKS.items():
+        if args.filter is not None and args.filter not in name:
+            continue
+        if args.quick:
+            n = max(1, n // 10)
+        result = run_benchmark(func, n, args.repeat)
+        results["results"][name] = result
+        print("{:<32} {:>12.0f} ns/op {:>14.0f} op/s".format(name, result["ns_per_op"], result["ops_per_s"]),
+              file=sys.stderr)
+
+    # Trace allocations with the human readable console, but without printing anything.
+    for name, func in ALLOCATION_CASES.items():
+        if args.filter is not None and args.filter not in name:
+            continue
+        with logger_state(human_mode=True) as logger:
+            result = measure_allocations(func(logger), 100 if args.quick else 1000)
+        results["allocations"][name] = result
+        print("{:<32} {:>12.0f} B peak/call {:>9.1f} B retained/call".format(
+            "alloc_" + name, result["peak_bytes_per_call"], result["retained_bytes_per_call"]), file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,10 @@ __email__ = "juangbhanich.k@gmail.com"
 __version__ = "0.0.0"
 
 import logkit.log
-from logkit.log import debug, info, warning, error, critical, get_instance
+from logkit.log import debug, info, warning, error, critical, exception, get_instance
 
 import logkit.pulse
 from logkit.pulse import get, increment
+
+import logkit.lifecycle
+from logkit.lifecycle import shutdown
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Detects sudden changes in the rate of a counter. Each counter keeps two exponentially weighted
+moving averages of its rate per second: a fast one that follows the current rate, and a slow one that
+is its baseline. When the fast rate rises above 'factor' times the baseline, or falls below the baseline
+divided by 'factor', the counter is anomalous. This takes a few floats per counter, no matter how long it runs.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Tuple, Union
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class RateBaseline:
+
+    __slots__ = ("last_total", "last_time", "fast", "slow", "n_samples", "level", "is_drop")
+
+    def __init__(self, total: float, now: float):
+        self.last_total = total
+        self.last_time = now
+        self.fast = 0.0
+        self.slow = 0.0
+        self.n_samples = 0
+        self.level = None  # The level of the anomaly the counter is in, if any.
+        self.is_drop = False  # If that anomaly is a drop in the rate, rather than a rise.
+
+
+class AnomalyDetector:
+
+    def __init__(self, factor: float=3.0, critical_factor: float=10.0, min_rate: float=1.0, alpha: float=0.02,
+                 fast_alpha: float=0.5, warmup: int=30):
+        # Multiples of the baseline above (or fractions of it below) which the rate is a WARNING, and a CRITICAL.
+        self.factor = factor
+        self.critical_factor = critical_factor
+
+        # Below this rate per second nothing is anomalous, so that quiet counters don't alert on every blip.
+        # A drop is only anomalous from a baseline of at least this rate.
+        self.min_rate = min_rate
+
+        # Weight of each sample in the baseline and in the current rate, and the samples to learn from first.
+        self.alpha = alpha
+        self.fast_alpha = fast_alpha
+        self.warmup = warmup
+
+        self.baseline_map = {}
+        self.n_checks = 0
+        self.last_check_time = None
+
+    def check(self, totals: Iterable[Tuple[object, Union[float, int]]], now: float) -> List[Tuple[object, Dict]]:
+        """ Take the running total of each counter. Returns the (key, anomaly) of the counters that have just
+        become anomalous, whose anomaly has just become critical, or whose rate has swung from a rise to a drop
+        (or back). """
+        is_warm = self.n_checks > self.warmup
+        anomalies = []
+        for key, total in totals:
+            baseline = self.baseline_map.get(key)
+            if baseline is None:
+                if not is_warm or self.last_check_time is None:
+                    self.baseline_map[key] = RateBaseline(total, now)
+                    continue
+
+                # A counter that first shows up after the warmup had a rate of 0 until the last check.
+                baseline = self.baseline_map[key] = RateBaseline(0, self.last_check_time)
+                baseline.n_samples = self.warmup + 1
+
+            anomaly = self._observe(baseline, total, now)
+            if anomaly is not None:
+                anomalies.append((key, anomaly))
+
+        self.n_checks += 1
+        self.last_check_time = now
+        return anomalies
+
+    def _observe(self, baseline: RateBaseline, total: Union[float, int], now: float) -> Union[Dict, None]:
+        elapsed = now - baseline.last_time
+        if elapsed <= 0:
+            return None
+
+        delta = total - baseline.last_total
+        baseline.last_total = total
+        baseline.last_time = now
+        if delta < 0:
+            # The counter was reset (such as in a forked child), so learn it again.
+            baseline.n_samples = 0
+            baseline.level = None
+            baseline.is_drop = False
+            return None
+
+        rate = delta / elapsed
+        if baseline.n_samples == 0:
+            baseline.fast = baseline.slow = rate
+        else:
+            baseline.fast += self.fast_alpha * (rate - baseline.fast)
+            baseline.slow += self.alpha * (rate - baseline.slow)
+        baseline.n_samples += 1
+
+        level, is_drop = self._level(baseline)
+        previous_level, was_drop = baseline.level, baseline.is_drop
+        baseline.level, baseline.is_drop = level, is_drop
+        if level is None:
+            return None
+        if previous_level is not None and is_drop == was_drop and level <= previous_level:
+            return None
+
+        return {
+            "level": level,
+            "direction": "drop" if is_drop else "rise",
+            "rate": baseline.fast,
+            "baseline": baseline.slow,
+        }
+
+    def _level(self, baseline: RateBaseline) -> Tuple[Union[int, None], bool]:
+        """ The level of the anomaly (or None), and if it is a drop in the rate. """
+        if baseline.n_samples <= self.warmup:
+            return None, False
+
+        # A drop, such as requests that stop coming in, only counts for a counter that was busy.
+        if baseline.slow >= self.min_rate:
+            if baseline.fast * self.critical_factor <= baseline.slow:
+                return logging.CRITICAL, True
+            if baseline.fast * self.factor <= baseline.slow:
+                return logging.WARNING, True
+
+        if baseline.fast < self.min_rate:
+            return None, False
+
+        # A counter that was silent has a baseline of 0, so compare against at least the minimum rate.
+        reference = max(baseline.slow, self.min_rate / self.factor)
+        if baseline.fast >= self.critical_factor * reference:
+            return logging.CRITICAL, False
+        if baseline.fast >= self.factor * reference:
+            return logging.WARNING, False
+        return None, False
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Collects records from a tight loop, and writes them together with Logger.write_many. The call-site
+is taken once, when the batch is created, and the records are written when the batch is flushed:
+when it is full, and when the 'with' block ends.
+"""
+
+import logging
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class Batch:
+
+    def __init__(self, logger, module_trace: str, max_size: int=1000, truncated: bool=False, module: str=None):
+        self.logger = logger
+        self.module_trace = module_trace
+        self.module = module
+        self.max_size = max_size
+        self.truncated = truncated
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.flush()
+
+    def add(self, level: int, message, data=None):
+        self.records.append((level, message, data))
+        if len(self.records) >= self.max_size:
+            self.flush()
+
+    def debug(self, message, data=None):
+        self.add(logging.DEBUG, message, data)
+
+    def info(self, message, data=None):
+        self.add(logging.INFO, message, data)
+
+    def warning(self, message, data=None):
+        self.add(logging.WARNING, message, data)
+
+    def error(self, message, data=None):
+        self.add(logging.ERROR, message, data)
+
+    def critical(self, message, data=None):
+        self.add(logging.CRITICAL, message, data)
+
+    def flush(self):
+        if len(self.records) == 0:
+            return
+        records = self.records
+        self.records = []
+        self.logger.write_many(records, self.module_trace, self.truncated, self.module)
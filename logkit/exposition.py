@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+Exposes the Pulse metrics in the OpenMetrics text format, so that they can be scraped.
+
+Counters are the cumulative totals since each Pulse started, and gauges are their latest values.
+Nested collector values are flattened into gauges, joining their keys with an underscore. Every series
+carries a 'pulse' label with the key of its Pulse, followed by its own labels if it has any.
+"""
+
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Dict, Iterable
+
+from logkit import pulse as pulse_module
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRIC_PREFIX = "logkit_"
+INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+# Formatted names and series prefixes from the last scrape, so that repeated scrapes only format the
+# values. Each scrape replaces them with the entries it used, so they hold the live series and no more.
+_name_cache = {}
+_series_cache = {}
+
+
+def metric_name(key: str, used: Dict=None) -> str:
+    name = _name_cache.get(key)
+    if name is None:
+        name = METRIC_PREFIX + INVALID_NAME_CHARS.sub("_", str(key))
+    if used is not None:
+        used[key] = name
+    return name
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series_prefix(name: str, suffix: str, pulse_key: str, label_set: tuple=(), used: Dict=None) -> str:
+    cache_key = (name, suffix, pulse_key, label_set)
+    prefix = _series_cache.get(cache_key)
+    if prefix is None:
+        label_strings = ['pulse="{}"'.format(escape_label_value(pulse_key))]
+        for k, v in label_set:
+            label_strings.append('{}="{}"'.format(INVALID_NAME_CHARS.sub("_", k), escape_label_value(v)))
+        prefix = '{}{}{{{}}} '.format(name, suffix, ",".join(label_strings))
+    if used is not None:
+        used[cache_key] = prefix
+    return prefix
+
+
+def _split_series(k) -> (str, tuple):
+    """ Labeled series are keyed by a (key, label set) tuple. """
+    if type(k) is tuple:
+        return k
+    return k, ()
+
+
+def _format_value(value) -> str:
+    if type(value) is bool:
+        return "1" if value else "0"
+    return repr(value) if type(value) is float else str(value)
+
+
+def _flatten(data: Dict, prefix: str="") -> Dict:
+    flat = {}
+    for k, v in data.items():
+        if type(k) is tuple:
+            if type(v) in (int, float, bool):
+                flat[k] = v
+            continue
+
+        key = "{}{}".format(prefix, k)
+        if type(v) is dict:
+            flat.update(_flatten(v, key + "_"))
+        elif type(v) in (int, float, bool):
+            flat[key] = v
+    return flat
+
+
+def all_pulses() -> list:
+    """ Every Pulse in this process, including those built directly (such as a PulseAggregator). """
+    return sorted(pulse_module.PULSE_SET, key=lambda p: p.key)
+
+
+def render(pulses: Iterable[pulse_module.Pulse]=None) -> str:
+    """ Render the metrics of these pulses (all of them by default) as OpenMetrics text. """
+    global _name_cache, _series_cache
+    if pulses is None:
+        pulses = all_pulses()
+
+    # Metric families: name -> (type, [series lines]).
+    families = {}
+    used_names = {}
+    used_series = {}
+    for pulse in pulses:
+        counter_totals, gauges = pulse.snapshot()
+
+        for k, v in counter_totals.items():
+            key, label_set = _split_series(k)
+            name = metric_name(key, used_names)
+            family = families.setdefault(name, ("counter", []))
+            if family[0] != "counter":
+                continue
+            prefix = _series_prefix(name, "_total", pulse.key, label_set, used_series)
+            family[1].append(prefix + _format_value(v))
+
+        for k, v in _flatten(gauges).items():
+            key, label_set = _split_series(k)
+            name = metric_name(key, used_names)
+            family = families.setdefault(name, ("gauge", []))
+            if family[0] != "gauge":
+                continue
+            family[1].append(_series_prefix(name, "", pulse.key, label_set, used_series) + _format_value(v))
+
+    # Series that are no longer scraped drop out of the caches.
+    _name_cache = used_names
+    _series_cache = used_series
+
+    lines = []
+    for name, (metric_type, series) in families.items():
+        lines.append("# TYPE {} {}".format(name, metric_type))
+        lines.extend(series)
+    lines.append("# EOF\n")
+    return "\n".join(lines)
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    """ Handles each scrape in a thread of its own. """
+    daemon_threads = True
+
+    # The pulses to serve, or None for all of them at the time of each scrape.
+    pulses = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = render(self.server.pulses).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Don't log every scrape.
+        pass
+
+
+def start_http_server(port: int=9100, host: str="127.0.0.1",
+                      pulses: Iterable[pulse_module.Pulse]=None) -> MetricsServer:
+    """ Serve the metrics of these pulses (all of them by default) on every path of this address, from a
+    daemon thread. """
+    server = MetricsServer((host, port), _MetricsHandler)
+    server.pulses = None if pulses is None else list(pulses)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
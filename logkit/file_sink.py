@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+A rotating file handler that can also take pre-formatted lines directly, so that the logger can
+write a record to disk without building a stdlib LogRecord for it.
+"""
+
+from logging.handlers import TimedRotatingFileHandler
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class FileSink(TimedRotatingFileHandler):
+
+    def write_line(self, line: str):
+        """ Write one formatted line, rotating the file first if it is due. """
+        self.acquire()
+        try:
+            # The time based rollover check does not look at the record.
+            if self.shouldRollover(None):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(line + self.terminator)
+            self.flush()
+        except Exception:
+            self.handleError(None)
+        finally:
+            self.release()
+
+    def write_lines(self, lines: list):
+        """ Write several formatted lines with a single write, rotating the file first if it is due. """
+        if len(lines) == 0:
+            return
+
+        self.acquire()
+        try:
+            if self.shouldRollover(None):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.terminator.join(lines) + self.terminator)
+            self.flush()
+        except Exception:
+            self.handleError(None)
+        finally:
+            self.release()
+
+    def reopen(self):
+        """ Close the stream and open the file again, such as after a fork. """
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+            self.stream = self._open()
+        finally:
+            self.release()
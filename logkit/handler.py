@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+A bridge from the standard logging module into logkit. Records from third-party libraries that log
+through 'logging' are written by the logkit Logger, so that they get the same console rendering,
+file rotation and socket shipping as everything else.
+"""
+
+import bisect
+import logging
+import threading
+
+from logkit.logger import Logger
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+# Attributes that every LogRecord has. Anything else was passed in through 'extra'.
+STANDARD_ATTRIBUTES = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+JSON_TYPES = (str, int, float, bool, type(None), list, dict)
+
+# The logkit levels, to map custom stdlib levels onto.
+LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+
+
+def to_logkit_level(level: int) -> int:
+    """ Round a stdlib level down to the nearest logkit level. """
+    index = bisect.bisect_right(LEVELS, level) - 1
+    return LEVELS[max(0, index)]
+
+
+class LogkitHandler(logging.Handler):
+
+    # Loggers that logkit writes to itself, and their children. Their records are never fed back in.
+    IGNORED_NAMES = frozenset(("logkit", "logkit_file_logger"))
+    IGNORED_PREFIX = "logkit."
+
+    def __init__(self, level: int=logging.NOTSET):
+        super().__init__(level)
+        self._local = threading.local()
+
+    def emit(self, record: logging.LogRecord):
+        if record.name in self.IGNORED_NAMES or record.name.startswith(self.IGNORED_PREFIX):
+            return
+
+        # Anything logged while we are already writing (such as a socket warning) is dropped, not recursed.
+        if getattr(self._local, "is_emitting", False):
+            return
+
+        self._local.is_emitting = True
+        try:
+            data = {}
+            for k, v in record.__dict__.items():
+                if k not in STANDARD_ATTRIBUTES:
+                    data[k] = v if type(v) in JSON_TYPES else str(v)
+            logger = Logger.get_instance()
+            if record.exc_info:
+                data = logger.exception_data(data, record.exc_info)
+
+            logger.write(
+                record.getMessage(),
+                data if len(data) > 0 else None,
+                to_logkit_level(record.levelno),
+                module_trace="{}:{}".format(record.module, record.lineno),
+                created=record.created,
+                module=record.name
+            )
+        except Exception:
+            self.handleError(record)
+        finally:
+            self._local.is_emitting = False
+
+
+def install(logger: logging.Logger=None, level: int=logging.NOTSET) -> LogkitHandler:
+    """ Attach a LogkitHandler to this logger (the root logger by default). """
+    if logger is None:
+        logger = logging.getLogger()
+    handler = LogkitHandler(level)
+    logger.addHandler(handler)
+    return handler
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+Flushes everything that is still in flight when the process exits. The socket logger ships records
+from a daemon thread, and a Pulse only reports at the end of its interval, so without this the last
+records and the last partial interval are lost.
+
+shutdown() runs at exit, and on SIGTERM or SIGHUP once the config has been loaded (unless
+SHUTDOWN__HANDLE_SIGNALS is off). Then the Pulses are stopped for good. It can also be called directly:
+the Pulses report their partial interval and keep running, so calling it again is harmless.
+"""
+
+import atexit
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict
+
+from logkit.logger import Logger
+from logkit.pulse import PULSE_SET
+from logkit.pulse_aggregator import PulseAggregator
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+SIGNALS = tuple(getattr(signal, name) for name in ("SIGTERM", "SIGHUP") if hasattr(signal, name))
+
+# Re-entrant, in case a signal arrives while the main thread is already shutting down.
+_lock = threading.RLock()
+
+
+def shutdown(timeout: float=None, is_exiting: bool=False) -> Dict:
+    """ Send the final Pulse reports, wait up to 'timeout' seconds for the queued records to be sent,
+    and close the log file. Returns the number of Pulses reported, and of records that were lost.
+    The Pulses are only stopped if the process 'is_exiting', otherwise they keep counting and reporting. """
+    with _lock:
+        logger = Logger._instance
+        if timeout is None:
+            timeout = logger.shutdown_timeout if logger is not None else 5
+        deadline = time.time() + timeout
+
+        # Workers push to an aggregator, so the aggregators report last.
+        n_pulses = 0
+        for pulse in sorted(PULSE_SET, key=lambda p: isinstance(p, PulseAggregator)):
+            if not pulse.is_running:
+                continue
+            if pulse.report():
+                n_pulses += 1
+            if is_exiting:
+                pulse.stop(with_report=False)
+
+        n_lost = 0
+        if logger is not None:
+            socket_logger = logger.socket_logger
+            if socket_logger is not None:
+                if not socket_logger.flush(max(0.0, deadline - time.time())):
+                    n_lost = socket_logger.n_pending
+                socket_logger.close()
+
+            # The streams are opened again if anything is logged after this.
+            for file_sink in logger.get_file_sinks():
+                file_sink.close()
+
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (AttributeError, ValueError):
+                pass
+
+    if n_lost > 0:
+        logging.getLogger(__name__).warning("Shutdown timed out: {} records were not sent.".format(n_lost))
+
+    return {"pulses_reported": n_pulses, "records_lost": n_lost}
+
+
+def _on_signal(signum, frame):
+    # The interrupted frame may be holding any of the logger's locks, so the shutdown runs in a thread of
+    # its own, which takes them once this handler has returned. A second signal terminates right away.
+    signal.signal(signum, signal.SIG_DFL)
+    threading.Thread(target=_shutdown_and_kill, args=(signum,), daemon=True).start()
+
+
+def _shutdown_and_kill(signum: int):
+    try:
+        shutdown(is_exiting=True)
+    finally:
+        # Then let the signal terminate the process, as it would have without us.
+        os.kill(os.getpid(), signum)
+
+
+def handle_signals():
+    """ Shut down before the process is terminated. The logger calls this when its config is loaded, if
+    SHUTDOWN__HANDLE_SIGNALS is on. Signal handlers can only be set from the main thread, and a handler
+    that the application has already set is never replaced. """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    for signum in SIGNALS:
+        if signal.getsignal(signum) == signal.SIG_DFL:
+            signal.signal(signum, _on_signal)
+
+
+atexit.register(shutdown, is_exiting=True)
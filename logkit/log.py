@@ -6,6 +6,8 @@ with lazy loading, and to be configured via the generated .env file.
 """
 
 import logging
+import sys
+from logkit.batch import Batch
 from logkit.logger import Logger
 
 __author__ = "Jakrin Juangbhanich"
@@ -32,6 +34,24 @@ def critical(message, data=None, truncated: bool=False):
     __log_with_level(message, data, logging.CRITICAL, truncated)
 
 
+def exception(message, data=None, truncated: bool=False):
+    """ Log an error, with the traceback of the exception that is currently being handled. """
+    data = Logger.get_instance().exception_data(data)
+    __log_with_level(message, data, logging.ERROR, truncated)
+
+
+def write_many(records, truncated: bool=False):
+    """ Write a sequence of (level, message, data) records at once, with a single call-site and time. """
+    logger = Logger.get_instance()
+    logger.write_many(records, logger.get_parent_module(2), truncated, sys._getframe(1).f_globals.get("__name__"))
+
+
+def batch(max_size: int=1000, truncated: bool=False) -> Batch:
+    """ Collect records, and write them together when the batch is full or the 'with' block ends. """
+    logger = Logger.get_instance()
+    return Batch(logger, logger.get_parent_module(2), max_size, truncated, sys._getframe(1).f_globals.get("__name__"))
+
+
 def with_divider(message):
     logger = Logger.get_instance()
     logger.write_with_divider(message)
@@ -41,6 +61,10 @@ def get_instance():
     return Logger.get_instance()
 
 
+def get_self_metrics():
+    return Logger.get_instance().get_self_metrics()
+
+
 def __log_with_level(message, data, level, truncated):
     logger = Logger.get_instance()
     logger.write(message, data, level, truncated)
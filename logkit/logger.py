@@ -5,20 +5,24 @@ An instance of the Logkit logger. Wraps the Python logger and some other 3rd-P i
 """
 
 import datetime
-import inspect
 import json
 import logging
 import os
 import sys
+import threading
 import time
-from logging.handlers import TimedRotatingFileHandler
 from typing import Union
-import shutil
 
 import dotenv
 
+from logkit.file_sink import FileSink
+from logkit.record import Record, format_body, format_timestamp, level_name, EMPTY_DATA, SEPARATOR
+from logkit.ring_buffer import RingBuffer
+from logkit.routing import Router, Route, DEFAULT_ROUTE, parse_rules
+from logkit.self_metrics import SelfMetrics
 from logkit.socket_logger import SocketLogger
-from logkit.utils import pather
+from logkit.tracebacks import TracebackCache
+from logkit.utils import fork, pather, terminal
 from logkit.utils.truncate import truncate
 
 __author__ = "Jakrin Juangbhanich"
@@ -47,14 +51,28 @@ class Logger:
 
     ISO_TIME_FMT = "%Y-%m-%dT%H:%M:%S%z"
     LOG_FMT = "%(levelname)s::%(asctime)s::%(message)s"
+    RECORD_FMT = "%(message)s"  # Records arrive at the handlers already formatted.
 
     BOX_STEM = "├"
     BOX_STEM_END = "└"
     BOX_BRANCH = "─"
     BOX_BRANCH_DOWN = "┬"
+    BOX_PIPE = "│"
     LOG_BULLET = "┃"
     H_BAR = "─"
     H_BAR_BULLET = "┠"
+
+    # Plain replacements for the box drawing characters, when the output is not a terminal.
+    ASCII_BOX = {
+        "BOX_STEM": "|",
+        "BOX_STEM_END": "`",
+        "BOX_BRANCH": "-",
+        "BOX_BRANCH_DOWN": "+",
+        "BOX_PIPE": "|",
+        "LOG_BULLET": "|",
+        "H_BAR": "-",
+        "H_BAR_BULLET": "|",
+    }
     TIME_BAR_INTERVAL = 60  # A minute between each bar print.
 
     # ======================================================================================================================
@@ -63,6 +81,14 @@ class Logger:
 
     _instance = None
 
+    # Placed between the data of a batch, so that it can be serialized with one json.dumps and split again.
+    BATCH_MARKER = "\x00logkit-batch\x00"
+    BATCH_SPLIT = ", {}, ".format(json.dumps(BATCH_MARKER))
+
+    # Stack depth from get_parent_module to the caller of the log function.
+    CALLER_DEPTH = 4
+    _module_name_map = {}
+
     @staticmethod
     def get_instance() -> "Logger":
         if Logger._instance is None:
@@ -74,26 +100,48 @@ class Logger:
         self.file_logger = None
         self.file_logging_map = None
 
+        # The rotating file handler of the file logger, which the records are written to directly.
+        self.file_sink = None
+
         self.socket_logger = None
 
+        # Metrics about the logger itself. None when they are turned off.
+        self.self_metrics = None
+
+        # Recent records below the file log level, held back until something goes wrong.
+        self.ring_buffer = None
+
+        # Routes records to their destinations by level and module. None when there are no rules.
+        self.router = None
+
         self.with_color = True
+        self.with_box = True
         self.with_level_prefix = True
         self.human_mode = False
 
         self.max_message_size = 256
         self.max_truncated_elements = 3
 
+        # Graceful shutdown.
+        self.shutdown_timeout = 5
+        self.handle_signals = True
+
+        # Fingerprints of the exceptions that have been logged, to collapse the repeats.
+        self.traceback_cache = TracebackCache(max_message_size=self.max_message_size)
+
         # Minimum log level to print the log.
         self.console_log_level = logging.INFO
         self.file_log_level = logging.INFO
 
         self.native_logger = logging.getLogger('logkit')
 
-        # Time bar management.
-        self.last_bar_time = 0
+        # Time bar management, on the monotonic clock.
+        self.last_bar_time = None
 
         self._load_config()
 
+        fork.register(self)
+
         # Create the native logging map.
         self.native_logging_map = {
             logging.DEBUG: self.native_logger.debug,
@@ -125,21 +173,56 @@ class Logger:
                 "backup_count": 30
             },
 
-            "#3": "\n# If we should automatically log to a socket.",
+            "#3": "\n# If we should automatically log to a socket. Transport is one of [tcp, udp, unix, unix_dgram],"
+                  "\n# and the unix transports connect to PATH instead of HOST and PORT. Protocol is one of"
+                  "\n# [lines, framed]. Framed batches are compressed [none, zlib, lz4, auto] and can be acknowledged.",
             "socket_logger": {
                 "active": False,
+                "transport": "tcp",
                 "host": "127.0.0.1",
-                "port": 5000
+                "port": 5000,
+                "path": None,
+                "timeout": 15,
+                "protocol": "lines",
+                "compression": "auto",
+                "ack": False
             },
 
             "#4": "\n# Log levels to display [DEBUG, INFO, WARNING, ERROR, CRITICAL]",
             "console_log_level": "INFO",
             "file_log_level": "INFO",
 
-            "#5": "\n# Readability settings for the console log.",
+            "#5": "\n# Readability settings for the console log. With AUTO_TTY, color and box drawing are turned"
+                  "\n# off when stdout is not a terminal (such as a pipe or a container log).",
             "human_mode": True,
             "with_color": True,
-            "with_level_prefix": False
+            "with_level_prefix": False,
+            "auto_tty": True,
+
+            "#6": "\n# If we should hold back records below the file log level in memory, and only write them"
+                  "\n# to the file and socket (as context) when a record at the trigger level arrives.",
+            "ring_buffer": {
+                "active": False,
+                "size": 1000,
+                "trigger_level": "ERROR"
+            },
+
+            "#7": "\n# If we should measure the cost of logging itself (per-sink latency, records and bytes).",
+            "self_metrics": False,
+
+            "#8": "\n# How many seconds to wait on exit for queued records and the final Pulse to be sent,"
+                  "\n# and if that should also happen when the process is terminated by SIGTERM or SIGHUP.",
+            "shutdown": {
+                "timeout": 5,
+                "handle_signals": True
+            },
+
+            "#9": "\n# Rules to route records by level and module, separated by ';'. Each is LEVELS[@MODULE,...]>DEST,..."
+                  "\n# where LEVELS is DEBUG, ERROR+ or *, and DEST is console, file, socket, default, drop or a path."
+                  "\n# For example: ERROR+>default,./logs/error.log;*@urllib3>drop;DEBUG>./logs/debug.log",
+            "routing": {
+                "rules": None
+            }
         }
         return data
 
@@ -205,6 +288,28 @@ class Logger:
         self.with_color = data["with_color"]
         self.with_level_prefix = data["with_level_prefix"]
 
+        if data["auto_tty"] and not terminal.is_terminal(sys.stdout):
+            self.set_box(False)
+            self.with_color = False
+        elif self.human_mode:
+            terminal.watch_resize()
+
+        self.shutdown_timeout = data["shutdown"]["timeout"]
+        self.handle_signals = data["shutdown"]["handle_signals"]
+        if self.handle_signals:
+            # Imported here, since the lifecycle module imports the logger.
+            from logkit import lifecycle
+            lifecycle.handle_signals()
+
+        if data["self_metrics"]:
+            self.self_metrics = SelfMetrics()
+
+        if data["ring_buffer"]["active"]:
+            self.ring_buffer = RingBuffer(
+                size=data["ring_buffer"]["size"],
+                trigger_level=logging._nameToLevel[data["ring_buffer"]["trigger_level"]]
+            )
+
         # Set the appropriate log level.
         self.console_log_level = logging._nameToLevel[data["console_log_level"]]
         self.file_log_level = logging._nameToLevel[data["file_log_level"]]
@@ -219,11 +324,24 @@ class Logger:
             self.file_logger.setLevel(self.file_log_level)
             self.file_logger.propagate = False
 
+        if data["routing"]["rules"] is not None:
+            self.router = Router(
+                parse_rules(data["routing"]["rules"]),
+                lambda path: self._create_file_sink(path, interval_unit, interval_value, backup_count)
+            )
+
         if data["socket_logger"]["active"]:
             self.socket_logger = SocketLogger(
                 host=data["socket_logger"]["host"],
-                port=data["socket_logger"]["port"]
+                port=data["socket_logger"]["port"],
+                transport=data["socket_logger"]["transport"],
+                path=data["socket_logger"]["path"],
+                timeout=data["socket_logger"]["timeout"],
+                protocol=data["socket_logger"]["protocol"],
+                compression=data["socket_logger"]["compression"],
+                ack=data["socket_logger"]["ack"]
             )
+            self.socket_logger.self_metrics = self.self_metrics
 
         # Set the level of the native logger.
         if not self.human_mode:
@@ -231,13 +349,10 @@ class Logger:
             self.native_logger.setLevel(self.console_log_level)
             handler = logging.StreamHandler(sys.stdout)
             handler.setLevel(self.console_log_level)
-            formatter = logging.Formatter(
-                fmt=self.LOG_FMT,
-                datefmt=self.ISO_TIME_FMT
-            )
-            handler.setFormatter(formatter)
+            handler.setFormatter(logging.Formatter(self.RECORD_FMT))
             self.native_logger.addHandler(handler)
-            self.native_logger.info("LogKit Initialized: Propagating logs to root logger and overriding root config.")
+            record = Record(logging.INFO, "LogKit Initialized: Propagating logs to root logger and overriding root config.")
+            self.native_logger.info(record.line)
 
     def _save_config_env(self, data):
         lines = []
@@ -262,21 +377,32 @@ class Logger:
             f.writelines("\n".join(lines))
 
     def _attach_file_logger(self, path, interval_unit: str = "d", interval_value: int = 1, backup_count: int = 30):
+        handler = self._create_file_sink(path, interval_unit, interval_value, backup_count)
+        self.file_logger.addHandler(handler)
+        self.file_sink = handler
+
+    def _create_file_sink(self, path, interval_unit: str = "d", interval_value: int = 1,
+                          backup_count: int = 30) -> FileSink:
         pather.create(path)
-        handler = TimedRotatingFileHandler(
+        handler = FileSink(
             path,
             when=interval_unit,
             interval=interval_value,
             backupCount=backup_count)
-        formatter = logging.Formatter(
-            self.LOG_FMT,
-            datefmt=self.ISO_TIME_FMT)
-        handler.setFormatter(formatter)
-        self.file_logger.addHandler(handler)
+        handler.setFormatter(logging.Formatter(self.RECORD_FMT))
+        return handler
+
+    def get_file_sinks(self) -> list:
+        """ The main file sink, and the file sinks of the routing rules. """
+        file_sinks = [] if self.file_sink is None else [self.file_sink]
+        if self.router is not None:
+            file_sinks.extend(self.router.sinks)
+        return file_sinks
 
     def set_file_logger(self, logger):
         # Log Level Map
         self.file_logger = logger
+        self.file_sink = None
         self.file_logger.setLevel(self.file_log_level)
         self.file_logging_map = {
             logging.DEBUG: logger.debug,
@@ -303,81 +429,341 @@ class Logger:
     # Normal Logging.
     # ======================================================================================================================
 
+    def _before_fork(self):
+        # Otherwise anything still buffered is written by both the parent and the child.
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (AttributeError, ValueError):
+                pass
+        for file_sink in self.get_file_sinks():
+            file_sink.flush()
+
+    def _after_fork_in_child(self):
+        # Locks that a thread of the parent may have been holding. The socket logger resets its own.
+        self.traceback_cache.lock = threading.Lock()
+        if self.self_metrics is not None:
+            self.self_metrics.lock = threading.Lock()
+
+        # The parent writes its own held records if it fails, so the child keeps only what it logs itself.
+        if self.ring_buffer is not None:
+            self.ring_buffer.lock = threading.Lock()
+            self.ring_buffer.drain()
+
+        for file_sink in self.get_file_sinks():
+            file_sink.reopen()
+
+    def set_box(self, with_box: bool):
+        """ Draw the console output with box drawing characters, or with plain ASCII. """
+        self.with_box = with_box
+        for k, v in self.ASCII_BOX.items():
+            if with_box:
+                self.__dict__.pop(k, None)
+            else:
+                setattr(self, k, v)
+
     def write_time_bar(self):
-        if time.time() - self.last_bar_time >= self.TIME_BAR_INTERVAL:
+        now = time.monotonic()
+        if self.last_bar_time is None or now - self.last_bar_time >= self.TIME_BAR_INTERVAL:
+            self.last_bar_time = now
             time_str = "{:%a, %d %b %H:%M}".format(datetime.datetime.now())
             self.write_with_divider(time_str)
-            self.last_bar_time = time.time()
 
     def write_with_divider(self, message):
-        cols, rows = shutil.get_terminal_size(fallback=(80, 456))
+        cols, rows = terminal.get_size()
         content_length = len(message) + 2
         half_size = (cols - content_length) // 2
-        left_side = self.set_color(self.H_BAR_BULLET + self.H_BAR * (half_size - 1), self.BLACK)
+        left_side = self.H_BAR_BULLET + self.H_BAR * (half_size - 1)
 
         right_side = self.H_BAR * (half_size - 1)
         if content_length % 2 != 0:
             right_side += self.H_BAR
-        right_side = self.set_color(right_side, self.BLACK)
-        message = self.set_color(message, self.BLACK)
+
+        if self.with_color:
+            left_side = self.set_color(left_side, self.BLACK)
+            right_side = self.set_color(right_side, self.BLACK)
+            message = self.set_color(message, self.BLACK)
 
         formatted_message = "{} {} {}".format(left_side, message, right_side)
         print(formatted_message)
         sys.stdout.flush()
 
-    def write(self, message, data, level, truncated: bool=False):
+    def write(self, message, data, level, truncated: bool=False, module_trace: str=None, created: float=None,
+              module: str=None):
+        """ Write the message to every sink. The call-site is looked up, unless the module trace is given.
+        The module name is only used for routing, and is taken from the call-site if it isn't given. The trace
+        holds only the last part of the module name, so it is never used for routing. """
+        router = self.router
+        if router is not None:
+            if module is None:
+                module = sys._getframe(self.CALLER_DEPTH - 1).f_globals.get("__name__")
+
+            route = router.route(level, module)
+            if route is not DEFAULT_ROUTE:
+                if route.is_dropped:
+                    return
+                if module_trace is None:
+                    module_trace = self.get_parent_module()
+                self._write_route(route, message, data, level, truncated, module_trace, created)
+                if not route.is_default:
+                    return
+
+        # Nothing will take this record, so skip all of the work.
+        if level < self.console_log_level and self.socket_logger is None and self.ring_buffer is None and \
+                (self.file_logger is None or level < self.file_log_level):
+            return
 
-        # Parse the data first.
-        data_string = None
-        if data is not None:
-            if type(data) is not dict:
-                message = "{}: {}".format(message, str(data))
-                data = None
-            else:
-                data_string = json.dumps(data)
+        metrics = self.self_metrics
+        if metrics is not None:
+            t_start = time.perf_counter()
 
-        module_trace = self.get_parent_module()
-        single_line_message = self.format_message_to_string(message, module_trace, data_string)
-        file_logging_action = self.get_file_logging_action(level)
-        if file_logging_action is not None:
-            file_logging_action(single_line_message.encode('utf-8'))
+        # Records below the file level are held back from the file and socket while the ring buffer is active.
+        to_sinks = True
+        ring_buffer = self.ring_buffer
+        if ring_buffer is not None:
+            if level < self.file_log_level:
+                to_sinks = False
+                if module_trace is None:
+                    module_trace = self.get_parent_module()
+                ring_buffer.append(level, message, data, module_trace, time.time() if created is None else created)
 
-        if self.socket_logger is not None:
-            time_format = datetime.datetime.now(datetime.timezone.utc).strftime(self.ISO_TIME_FMT)
-            log_level = logging.getLevelName(level).upper()
-            socket_message = "{}::{}::{}".format(log_level, time_format, single_line_message)
-            self.socket_logger.send(socket_message)
+                # Nothing else will show this record, so don't format it.
+                if level < self.console_log_level:
+                    return
+
+            elif level >= ring_buffer.trigger_level:
+                self.flush_ring_buffer()
+
+        # Parse the data first.
+        message, data, data_string = self.parse_data(message, data)
+
+        if metrics is not None:
+            t_serialized = time.perf_counter()
+            metrics.observe_serialize(t_serialized - t_start)
+
+        if module_trace is None:
+            module_trace = self.get_parent_module()
+
+        if metrics is not None:
+            t_sink = time.perf_counter()
+            metrics.observe_capture(t_sink - t_serialized)
+
+        # The record formats its line at most once, and every sink shares it.
+        record = Record(level, message, module_trace, data_string, created)
+        if to_sinks and self.file_logger is not None:
+            self._write_file(record)
+            if metrics is not None and level >= self.file_log_level:
+                t_end = time.perf_counter()
+                metrics.observe_sink(SelfMetrics.FILE, t_end - t_sink, len(record.encoded))
+                t_sink = t_end
+
+        if self.socket_logger is not None and to_sinks:
+            self.socket_logger.send(record.encoded)
+            if metrics is not None:
+                # The send itself is measured on the sender thread, as the 'socket' sink.
+                t_end = time.perf_counter()
+                metrics.observe_sink(SelfMetrics.SOCKET_ENQUEUE, t_end - t_sink, len(record.encoded))
+                t_sink = t_end
 
         if self.human_mode:
             # Only human readable messages are truncated.
             self.console_write(message, data, level, with_color=self.with_color, truncated=truncated)
         else:
-            self.native_logging_map[level](single_line_message)
+            self.native_logging_map[level](record.line)
+
+        if metrics is not None and level >= self.console_log_level:
+            metrics.observe_sink(SelfMetrics.CONSOLE, time.perf_counter() - t_sink)
+
+    def _write_route(self, route: Route, message, data, level, truncated: bool, module_trace: str, created: float):
+        """ Write the record to the destinations of its routing rule. Only the console still checks the level. """
+        message, data, data_string = self.parse_data(message, data)
+        record = Record(level, message, module_trace, data_string, created)
+
+        for file_sink in route.sinks:
+            file_sink.write_line(record.line)
+
+        if route.file and self.file_logger is not None:
+            self._write_file(record, check_level=False)
+
+        if route.socket and self.socket_logger is not None:
+            self.socket_logger.send(record.encoded)
+
+        if route.console:
+            if self.human_mode:
+                self.console_write(message, data, level, with_color=self.with_color, truncated=truncated)
+            else:
+                self.native_logging_map[level](record.line)
+
+    def write_many(self, records, module_trace: str=None, truncated: bool=False, module: str=None):
+        """ Write a sequence of (level, message, data) records from one call-site. The call-site and the time
+        are taken once for the whole batch, and the file and the socket get a single write. """
+        if module_trace is None:
+            module_trace = self.get_parent_module(2)
+        if module is None:
+            module = sys._getframe(1).f_globals.get("__name__")
+        created = time.time()
+
+        # The ring buffer, the self metrics and the routing work record by record.
+        if self.ring_buffer is not None or self.self_metrics is not None or self.router is not None:
+            for level, message, data in records:
+                self.write(message, data, level, truncated, module_trace, created, module)
+            return
+
+        socket_logger = self.socket_logger
+        file_level = self.file_log_level if self.file_logger is not None else None
+        min_level = self.console_log_level
+        if socket_logger is not None:
+            min_level = logging.NOTSET
+        elif file_level is not None:
+            min_level = min(min_level, file_level)
+
+        # Data that isn't a dict is added to the message, as in parse_data. The dicts are serialized together.
+        kept = []
+        data_list = []
+        for level, message, data in records:
+            if level < min_level:
+                continue
+            if data is not None and type(data) is not dict:
+                message, data, _ = self.parse_data(message, data)
+            elif type(message) is not str:
+                message = str(message)
+            kept.append((level, message, data))
+            if data is not None:
+                data_list.append(data)
+        data_strings = iter(self.dumps_many(data_list))
+
+        # Every record shares the time and the trace, so the line prefix is formatted once per level.
+        prefix_map = {}
+        entries = []
+        for level, message, data in kept:
+            prefix = prefix_map.get(level)
+            if prefix is None:
+                prefix = prefix_map[level] = "{}{}{}{}{}{}".format(
+                    level_name(level), SEPARATOR, format_timestamp(created), SEPARATOR, module_trace, SEPARATOR)
+            data_string = EMPTY_DATA if data is None else next(data_strings)
+            entries.append((level, prefix + message + SEPARATOR + data_string, message, data))
+
+        if file_level is not None:
+            lines = [line for level, line, _, _ in entries if level >= file_level]
+            if self.file_sink is not None:
+                self.file_sink.write_lines(lines)
+            else:
+                for level, line, _, _ in entries:
+                    if level >= file_level:
+                        self.get_file_logging_action(level)(line)
+
+        if socket_logger is not None:
+            socket_logger.send_many([(line + "\n").encode("utf-8") for _, line, _, _ in entries])
+
+        console_level = self.console_log_level
+        if self.human_mode:
+            for level, _, message, data in entries:
+                if level >= console_level:
+                    self.console_write(message, data, level, with_color=self.with_color, truncated=truncated)
+            return
+
+        # Each record is a LogRecord of its own, as the handlers and filters on the native logger expect.
+        native_logging_map = self.native_logging_map
+        for level, line, _, _ in entries:
+            if level >= console_level:
+                native_logging_map[level](line)
+
+    @staticmethod
+    def dumps_many(data_list: list) -> list:
+        """ The JSON string of each dict, from a single json.dumps of them all. """
+        if len(data_list) < 2:
+            return [json.dumps(data) for data in data_list]
+
+        interleaved = [Logger.BATCH_MARKER] * (2 * len(data_list) - 1)
+        interleaved[::2] = data_list
+        data_strings = json.dumps(interleaved)[1:-1].split(Logger.BATCH_SPLIT)
+
+        # The data itself had the marker in it, so it can't be split apart.
+        if len(data_strings) != len(data_list):
+            return [json.dumps(data) for data in data_list]
+        return data_strings
+
+    def exception_data(self, data, exc_info: tuple=None):
+        """ Add the exception being handled (or the given exc_info) to the data, under 'exception'. """
+        exception = self.traceback_cache.capture(sys.exc_info() if exc_info is None else exc_info)
+        if exception is None:
+            return data
+
+        if data is None:
+            data = {}
+        elif type(data) is not dict:
+            data = {"data": str(data)}
+        else:
+            data = dict(data)
+        data["exception"] = exception
+        return data
 
     @staticmethod
-    def format_message_to_string(message, module_trace, data):
+    def parse_data(message, data):
+        """ Returns the message, the data dict and its JSON string. Data that isn't a dict is added to the message. """
+        if data is None:
+            return message, None, None
 
-        strings = []
+        if type(data) is not dict:
+            return "{}: {}".format(message, str(data)), None, None
 
-        if module_trace is not None:
-            strings.append(module_trace)
+        return message, data, json.dumps(data)
 
-        strings.append(message)
+    def flush_ring_buffer(self):
+        """ Format the held back records, and write them to the file and socket. """
+        for level, message, data, module_trace, created in self.ring_buffer.drain():
+            message, data, data_string = self.parse_data(message, data)
+            record = Record(level, message, module_trace, data_string, created)
 
-        if data is not None:
-            strings.append(data)
+            # Bypass the file logger's level, since these records are below it by definition.
+            if self.file_logger is not None:
+                self._write_file(record, check_level=False)
+
+            if self.socket_logger is not None:
+                self.socket_logger.send(record.encoded)
+
+    def _write_file(self, record: Record, check_level: bool=True):
+        if check_level and record.level < self.file_log_level:
+            return
+
+        # Write straight to our own rotating file, or through a logger that was set from outside.
+        if self.file_sink is not None:
+            self.file_sink.write_line(record.line)
+        elif check_level:
+            file_logging_action = self.get_file_logging_action(record.level)
+            if file_logging_action is not None:
+                file_logging_action(record.line)
         else:
-            strings.append("{}")
+            self.file_logger.handle(logging.makeLogRecord({
+                "name": self.file_logger.name,
+                "msg": record.line,
+                "levelno": record.level,
+                "levelname": record.level_name,
+            }))
+
+    def get_self_metrics(self) -> Union[dict, None]:
+        """ A snapshot of the logger's own metrics, or None if they are turned off. """
+        if self.self_metrics is None:
+            return None
 
-        strings = map(str, strings)
-        return "::".join(strings)
+        snapshot = self.self_metrics.snapshot()
+        if self.socket_logger is not None:
+            snapshot["socket_queue_depth"] = self.socket_logger.n_pending
+        return snapshot
+
+    @staticmethod
+    def format_message_to_string(message, module_trace, data):
+        return format_body(message, module_trace, data)
 
     @staticmethod
-    def get_parent_module() -> str:
-        from_stack = inspect.stack()[4]
-        stack_module = inspect.getmodule(from_stack[0])
-        module_name = stack_module.__name__.split(".")[-1]
-        return "{}:{}".format(module_name, from_stack.lineno)
+    def get_parent_module(depth: int=CALLER_DEPTH) -> str:
+        frame = sys._getframe(depth)
+        name = frame.f_globals.get("__name__")
+        module_name = Logger._module_name_map.get(name)
+        if module_name is None:
+            module_name = str(name).split(".")[-1]
+            Logger._module_name_map[name] = module_name
+        return "{}:{}".format(module_name, frame.f_lineno)
 
     def console_write(self, message, data, level, with_color: bool = False, truncated: bool=False):
         """ Custom function to write message to console. """
@@ -411,7 +797,7 @@ class Logger:
 
                     stem_arr = []
                     for i in range(indent):
-                        stem_arr.append("│ " if not indent_end_stack[i] else "  ")
+                        stem_arr.append(self.BOX_PIPE + " " if not indent_end_stack[i] else "  ")
 
                     stem_arr.append(self.BOX_STEM_END if is_last_element else self.BOX_STEM)
                     stem_arr.append(self.BOX_BRANCH)
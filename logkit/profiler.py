@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+An opt-in, in-process sampling profiler. A background thread samples the stack of every other
+thread at a fixed rate, and adds the samples into a trie of stack frames. The hottest stacks are
+periodically logged (or reported through a Pulse), and the trie can be written out as collapsed
+stacks for flamegraph tools.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from logkit.log import info
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+PROFILER = None
+
+
+class StackNode:
+
+    __slots__ = ("children", "count")
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0  # Samples in which this frame was the innermost one.
+
+
+class Profiler:
+
+    def __init__(self, rate_hz: float=100, top_n: int=10, report_interval: float=60, max_depth: int=64,
+                 with_log: bool=True):
+
+        self.rate_hz = rate_hz
+        self.top_n = top_n
+        self.report_interval = report_interval
+        self.max_depth = max_depth
+        self.with_log = with_log
+
+        # Samples.
+        self.root = StackNode()
+        self.n_samples = 0
+        self.lock = threading.Lock()
+
+        # Frame labels, formatted once per code object.
+        self._label_map = {}
+
+        self._thread = None
+        self._is_running = False
+        self._prev_report_time = time.time()
+
+    def start(self) -> "Profiler":
+        if not self._is_running:
+            self._is_running = True
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+            info("Profiler Started", {"rate_hz": self.rate_hz})
+        return self
+
+    def stop(self):
+        self._is_running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        with self.lock:
+            self.root = StackNode()
+            self.n_samples = 0
+
+    def _loop(self):
+        interval = 1.0 / self.rate_hz
+        own_id = threading.get_ident()
+        next_time = time.monotonic()
+
+        while self._is_running:
+            self.sample(exclude_thread_id=own_id)
+
+            if self.report_interval is not None and time.time() - self._prev_report_time > self.report_interval:
+                self.report()
+
+            # Keep to the rate, without trying to catch up on missed samples.
+            next_time = max(next_time + interval, time.monotonic())
+            time.sleep(max(0.0, next_time - time.monotonic()))
+
+    def sample(self, exclude_thread_id: int=None):
+        """ Add one sample of every thread's current stack. """
+        frames = sys._current_frames()
+        with self.lock:
+            for thread_id, frame in frames.items():
+                if thread_id == exclude_thread_id:
+                    continue
+
+                # Walk from the innermost frame outwards, then insert from the root.
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+
+                node = self.root
+                for label in reversed(stack):
+                    child = node.children.get(label)
+                    if child is None:
+                        child = node.children[label] = StackNode()
+                    node = child
+                node.count += 1
+            self.n_samples += 1
+
+    def _label(self, code) -> str:
+        label = self._label_map.get(code)
+        if label is None:
+            module_name = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = "{}:{}:{}".format(module_name, code.co_name, code.co_firstlineno)
+            self._label_map[code] = label
+        return label
+
+    def stacks(self) -> List[Tuple[Tuple[str, ...], int]]:
+        """ Every sampled stack, from the outermost frame, with its sample count. """
+        stacks = []
+        with self.lock:
+            pending = [(self.root, ())]
+            while pending:
+                node, path = pending.pop()
+                if node.count > 0:
+                    stacks.append((path, node.count))
+                for label, child in node.children.items():
+                    pending.append((child, path + (label,)))
+        return stacks
+
+    def top_stacks(self, n: int=None) -> List[Tuple[Tuple[str, ...], int]]:
+        n = self.top_n if n is None else n
+        return sorted(self.stacks(), key=lambda x: x[1], reverse=True)[:n]
+
+    def summary(self) -> Dict:
+        """ The hottest stacks, keyed by their innermost frames. Suitable for a Pulse collector. """
+        top = {}
+        for stack, count in self.top_stacks():
+            top[" < ".join(reversed(stack[-3:]))] = count
+        return {"n_samples": self.n_samples, "top": top}
+
+    def report(self):
+        self._prev_report_time = time.time()
+        if self.with_log:
+            info("Profiler Hot Stacks", self.summary())
+
+    def collapsed(self) -> str:
+        """ The samples in the collapsed stack format ('outer;inner count'), as read by flamegraph tools. """
+        return "".join("{} {}\n".format(";".join(stack), count) for stack, count in self.stacks())
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+
+def start(rate_hz: float=100, top_n: int=10, report_interval: float=60) -> Profiler:
+    global PROFILER
+    if PROFILER is None:
+        PROFILER = Profiler(rate_hz=rate_hz, top_n=top_n, report_interval=report_interval)
+    return PROFILER.start()
+
+
+def stop():
+    if PROFILER is not None:
+        PROFILER.stop()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+A compact, length-framed batch protocol for shipping records over a socket.
+
+Each frame is a fixed size header followed by the payload. The payload is the batch of records, each
+prefixed with its length so that it may contain newlines of its own, and is optionally compressed. If the frame asks for an acknowledgment, the receiver
+replies with an ack carrying the frame's sequence number once it has handled every record.
+
+    Header: magic (2s) | version (B) | flags (B) | sequence (I) | record count (I) | payload size (I)
+    Record: length (I) | record
+    Ack:    magic (2s) | sequence (I)
+"""
+
+import struct
+import zlib
+from collections import namedtuple
+from typing import List
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+MAGIC = b"LK"
+ACK_MAGIC = b"LA"
+VERSION = 2
+
+HEADER = struct.Struct("!2sBBIII")
+RECORD_LENGTH = struct.Struct("!I")
+ACK = struct.Struct("!2sI")
+
+# Compression codecs live in the low bits of the flags, the ack request in the high bit.
+NONE = "none"
+ZLIB = "zlib"
+LZ4 = "lz4"
+AUTO = "auto"
+
+CODEC_IDS = {NONE: 0, ZLIB: 1, LZ4: 2}
+CODEC_NAMES = {v: k for k, v in CODEC_IDS.items()}
+CODEC_MASK = 0x0F
+ACK_FLAG = 0x80
+
+MAX_SEQUENCE = 2 ** 32
+
+DELIMITER = b"\n"
+
+FrameHeader = namedtuple("FrameHeader", ["version", "codec", "ack", "sequence", "count", "size"])
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def resolve_codec(codec: str) -> str:
+    """ Pick the best available codec for 'auto', and check that an explicit codec can be used. """
+    if codec == AUTO:
+        return LZ4 if lz4 is not None else ZLIB
+
+    if codec not in CODEC_IDS:
+        raise ValueError("Unknown compression codec: {}".format(codec))
+
+    if codec == LZ4 and lz4 is None:
+        raise ValueError("The lz4 codec requires the 'lz4' package.")
+
+    return codec
+
+
+def compress(payload: bytes, codec: str) -> bytes:
+    if codec == ZLIB:
+        return zlib.compress(payload)
+    if codec == LZ4:
+        return lz4.frame.compress(payload)
+    return payload
+
+
+def decompress(payload: bytes, codec: str) -> bytes:
+    if codec == ZLIB:
+        return zlib.decompress(payload)
+    if codec == LZ4:
+        if lz4 is None:
+            raise ProtocolError("Received an lz4 frame, but the 'lz4' package is not installed.")
+        return lz4.frame.decompress(payload)
+    return payload
+
+
+def encode_frame(records: List[bytes], sequence: int, codec: str=NONE, ack: bool=False) -> bytes:
+    """ Pack the records into a single frame. A record's newline terminator, if it has one, is not sent. """
+    parts = []
+    for record in records:
+        if record.endswith(DELIMITER):
+            record = record[:-1]
+        parts.append(RECORD_LENGTH.pack(len(record)))
+        parts.append(record)
+    payload = compress(b"".join(parts), codec)
+    flags = CODEC_IDS[codec] | (ACK_FLAG if ack else 0)
+    header = HEADER.pack(MAGIC, VERSION, flags, sequence % MAX_SEQUENCE, len(records), len(payload))
+    return header + payload
+
+
+def decode_header(data: bytes) -> FrameHeader:
+    magic, version, flags, sequence, count, size = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ProtocolError("Invalid frame magic: {}".format(magic))
+
+    if version != VERSION:
+        raise ProtocolError("Unsupported frame version: {}".format(version))
+
+    codec = CODEC_NAMES.get(flags & CODEC_MASK)
+    if codec is None:
+        raise ProtocolError("Unknown frame codec: {}".format(flags & CODEC_MASK))
+
+    return FrameHeader(version, codec, bool(flags & ACK_FLAG), sequence, count, size)
+
+
+def decode_payload(header: FrameHeader, payload: bytes) -> List[bytes]:
+    """ Returns the records in the frame, without their newline terminators. """
+    payload = decompress(payload, header.codec)
+    records = []
+    offset = 0
+    while offset < len(payload):
+        if offset + RECORD_LENGTH.size > len(payload):
+            raise ProtocolError("Frame ends inside a record length.")
+        size, = RECORD_LENGTH.unpack_from(payload, offset)
+        offset += RECORD_LENGTH.size
+        if offset + size > len(payload):
+            raise ProtocolError("Frame ends inside a record.")
+        records.append(payload[offset:offset + size])
+        offset += size
+
+    if len(records) != header.count:
+        raise ProtocolError("Frame declared {} records, but contained {}.".format(header.count, len(records)))
+    return records
+
+
+def decode_frame(data: bytes) -> (FrameHeader, List[bytes]):
+    """ Decode one whole frame, such as a datagram. """
+    if len(data) < HEADER.size:
+        raise ProtocolError("Frame is shorter than its header.")
+
+    header = decode_header(data[:HEADER.size])
+    payload = data[HEADER.size:]
+    if len(payload) != header.size:
+        raise ProtocolError("Frame declared {} payload bytes, but contained {}.".format(header.size, len(payload)))
+    return header, decode_payload(header, payload)
+
+
+def encode_ack(sequence: int) -> bytes:
+    return ACK.pack(ACK_MAGIC, sequence)
+
+
+def decode_ack(data: bytes) -> int:
+    magic, sequence = ACK.unpack(data)
+    if magic != ACK_MAGIC:
+        raise ProtocolError("Invalid ack magic: {}".format(magic))
+    return sequence
+
+
+def recv_exactly(sock, size: int) -> bytes:
+    """ Read exactly 'size' bytes from a stream socket. Returns fewer only if the peer closed it. """
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(sock) -> (FrameHeader, List[bytes]):
+    """ Read one frame from a stream socket. Returns (None, None) if the peer closed the connection. """
+    data = recv_exactly(sock, HEADER.size)
+    if len(data) < HEADER.size:
+        return None, None
+
+    header = decode_header(data)
+    payload = recv_exactly(sock, header.size)
+    if len(payload) < header.size:
+        return None, None
+
+    return header, decode_payload(header, payload)
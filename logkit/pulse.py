@@ -5,10 +5,18 @@ Static functions for using the logger. The logger is supposed to be set up
 with lazy loading, and to be configured via the generated .env file.
 """
 
+import json
+import logging
+import os
+import socket
+import sys
 import threading
 import time
-from typing import Union, Dict
-from .log import info
+import weakref
+from typing import Union, Dict, Callable, Tuple
+from .anomaly import AnomalyDetector
+from .log import info, warning, critical, get_instance
+from .utils import fork
 
 __author__ = "Jakrin Juangbhanich"
 __email__ = "juangbhanich.k@gmail.com"
@@ -17,6 +25,35 @@ __email__ = "juangbhanich.k@gmail.com"
 DEFAULT_PULSE_KEY = "default"
 PULSE_MAP = {}
 
+# Every running Pulse, including those that are not in the map, for the final report on shutdown.
+PULSE_SET = weakref.WeakSet()
+
+# Interned label sets, shared by every Pulse. A label set is a sorted tuple of (name, value) pairs.
+LABEL_SET_MAP = {}
+OVERFLOW_LABELS = (("overflow", "true"),)
+LABELED_KEY = "__labeled__"
+
+
+def labels(**kwargs) -> tuple:
+    """ Build a label set up front, so that it can be passed to increment or gauge without any sorting.
+    It is interned by the first metric that admits it. """
+    return _label_set(kwargs)
+
+
+def intern_labels(label_map: Dict) -> tuple:
+    label_set = _label_set(label_map)
+    return LABEL_SET_MAP.setdefault(label_set, label_set)
+
+
+def _label_set(label_map: Dict) -> tuple:
+    """ The sorted label set, or its interned copy if there is one. This never adds to the intern table. """
+    label_set = tuple(sorted((str(k), str(v)) for k, v in label_map.items()))
+    return LABEL_SET_MAP.get(label_set, label_set)
+
+
+def format_labels(label_set: tuple) -> str:
+    return ",".join("{}={}".format(k, v) for k, v in label_set)
+
 
 class Pulse:
 
@@ -25,8 +62,9 @@ class Pulse:
     HOURS = "h"
     HEART = "❤"  # f"\33[31m❤\33[0m"
     SLEEP_INTERVAL = 1
+    MAX_LABEL_SETS = 1000  # Per metric. Any further label sets are counted in the overflow series.
 
-    def __init__(self, key: str, interval_unit: str="m", interval_value: int=15):
+    def __init__(self, key: str, interval_unit: str="m", interval_value: int=15, max_label_sets: int=MAX_LABEL_SETS):
 
         # Initialize an instance of a Pulse.
         self.key = key
@@ -42,14 +80,37 @@ class Pulse:
         self._time_end_str = self._get_time_str()
         self._prev_time = time.time()
 
-        # History of counter and gauges.
+        # History of counter and gauges. Labeled series are keyed by a (key, label set) tuple.
         self.counter_map = {}
         self.gauge_map = {}
 
+        # Number of label sets in use by each metric, to cap the cardinality.
+        self.max_label_sets = max_label_sets
+        self.counter_label_count_map = {}
+        self.gauge_label_count_map = {}
+        self.n_overflow = 0
+
+        # Cumulative values since the Pulse started, for scraping. These are never reset.
+        self.counter_total_map = {}
+        self.gauge_last_map = {}
+
+        # Callables that are sampled into the gauges on each beat.
+        self.collector_map = {}
+
+        # When set, the rate of each counter is compared to its baseline on every tick, between the beats.
+        self.anomaly_detector = None
+
+        # When set, each interval is pushed to a PulseAggregator instead of being reported here.
+        self.aggregator_address = None
+        self._aggregator_socket = None
+
         info("Pulse Initialized", {"key": key})
 
         # Start the event loop.
+        self.is_running = True
         threading.Thread(target=self._loop, daemon=True).start()
+        PULSE_SET.add(self)
+        fork.register(self)
 
     def set_interval(self, interval_unit: str, interval_value: int):
         self.interval_unit = interval_unit
@@ -70,29 +131,181 @@ class Pulse:
             "interval_value": self.interval_value
         })
 
-    def increment(self, key: str, delta: Union[float, int]=1):
+    def increment(self, key: str, delta: Union[float, int]=1, labels: Union[Dict, tuple]=None):
+        if labels is not None:
+            key = self._series(key, labels, self.counter_map, self.counter_label_count_map)
+
         if key not in self.counter_map:
             self.counter_map[key] = delta
         else:
             self.counter_map[key] += delta
-    
-    def gauge(self, key: str, value: Union[float, int]):
+
+        if key not in self.counter_total_map:
+            self.counter_total_map[key] = delta
+        else:
+            self.counter_total_map[key] += delta
+
+    def gauge(self, key: str, value: Union[float, int], labels: Union[Dict, tuple]=None):
+        if labels is not None:
+            key = self._series(key, labels, self.gauge_map, self.gauge_label_count_map)
+
         self.gauge_map[key] = value
+        self.gauge_last_map[key] = value
+
+    def _series(self, key: str, labels: Union[Dict, tuple], series_map: Dict, label_count_map: Dict) -> tuple:
+        """ The map key for this labeled series, or the overflow series if the metric is at its cap. The label
+        set is only interned once the series is admitted, so that the overflow doesn't grow the intern table. """
+        label_set = labels if type(labels) is tuple else _label_set(labels)
+        series = (key, label_set)
+        if series in series_map:
+            return series
+
+        n_label_sets = label_count_map.get(key, 0)
+        if n_label_sets >= self.max_label_sets:
+            self.n_overflow += 1
+            return key, OVERFLOW_LABELS
+
+        label_count_map[key] = n_label_sets + 1
+        return key, LABEL_SET_MAP.setdefault(label_set, label_set)
+
+    def memory_usage(self) -> Dict:
+        """ An estimate of the memory held by this Pulse's series. """
+        n_bytes = 0
+        n_series = 0
+        for series_map in (self.counter_map, self.gauge_map, self.counter_total_map, self.gauge_last_map):
+            n_series += len(series_map)
+            n_bytes += sys.getsizeof(series_map)
+            for k, v in series_map.items():
+                n_bytes += sys.getsizeof(v)
+                if type(k) is tuple:
+                    # The label set itself is interned and shared, so only count the series tuple.
+                    n_bytes += sys.getsizeof(k)
+
+        # The intern table is shared by every Pulse, so each of them counts all of it.
+        n_bytes += sys.getsizeof(LABEL_SET_MAP)
+        for label_set in list(LABEL_SET_MAP):
+            n_bytes += sys.getsizeof(label_set)
+            for pair in label_set:
+                n_bytes += sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+
+        return {
+            "n_series": n_series,
+            "n_overflow": self.n_overflow,
+            "n_label_sets": len(LABEL_SET_MAP),
+            "bytes": n_bytes,
+        }
+
+    def add_collector(self, key: str, collector: Callable[[], Dict]):
+        """ Report the output of the collector under this gauge key on every beat. """
+        self.collector_map[key] = collector
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        """ Copies of the cumulative counters and the latest gauges (including collectors), for scraping. """
+        gauges = dict(self.gauge_last_map)
+        for k, collector in self.collector_map.items():
+            gauges[k] = collector()
+        return dict(self.counter_total_map), gauges
+
+    def set_anomaly_detection(self, factor: float=3.0, critical_factor: float=10.0, min_rate: float=1.0,
+                              alpha: float=0.02, warmup: int=30):
+        """ Log a WARNING (or a CRITICAL) as soon as a counter's rate per second rises above 'factor' (or
+        'critical_factor') times its exponentially weighted baseline, or falls below the baseline divided by
+        them. The counters are checked every second. """
+        self.anomaly_detector = AnomalyDetector(
+            factor=factor, critical_factor=critical_factor, min_rate=min_rate, alpha=alpha, warmup=warmup
+        )
+
+    def set_aggregator(self, address: Union[str, Tuple[str, int]], push_interval: int=1):
+        """ Push the interval deltas to the PulseAggregator at this (host, port) or Unix socket path. """
+        family = socket.AF_UNIX if type(address) is str else socket.AF_INET
+        self._aggregator_socket = socket.socket(family, socket.SOCK_DGRAM)
+        self.aggregator_address = address
+        self.set_interval(self.SECONDS, push_interval)
+
+    def _after_fork_in_child(self):
+        # The child starts a fresh interval of its own. What the parent counted so far is the parent's to report.
+        for series_map in (self.counter_map, self.gauge_map, self.counter_total_map, self.gauge_last_map,
+                           self.counter_label_count_map, self.gauge_label_count_map):
+            series_map.clear()
+        self.n_overflow = 0
+        self._time_start_str = self._get_time_str()
+        self._prev_time = time.time()
+
+        if self._aggregator_socket is not None:
+            self._aggregator_socket.close()
+            self._aggregator_socket = socket.socket(self._aggregator_socket.family, socket.SOCK_DGRAM)
+
+        # The event loop thread did not survive the fork.
+        if self.is_running:
+            threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self, with_report: bool=True):
+        """ Stop the event loop for good, and report (or push) the values of the current, partial interval.
+        Anything counted after this is never reported. """
+        if not self.is_running:
+            return
+        self.is_running = False
+        if with_report:
+            self.report()
+
+    def report(self) -> bool:
+        """ Report (or push) the values of the current, partial interval now. The next interval starts from here,
+        and the event loop keeps running. Returns False if there was nothing to report. """
+        if not self._has_values():
+            return False
+        self._execute()
+        return True
+
+    def _has_values(self) -> bool:
+        # The keys of past intervals stay in the maps, with their values reset to 0.
+        return any(v != 0 for v in self.counter_map.values()) or any(v != 0 for v in self.gauge_map.values()) or \
+            len(self.collector_map) > 0
 
     def _loop(self):
-        while True:
+        while self.is_running:
             time.sleep(self.SLEEP_INTERVAL)
+            if not self.is_running:
+                break
+            if self.anomaly_detector is not None:
+                self._check_anomalies(time.monotonic())
             duration = time.time() - self._prev_time
             if duration > self._interval:
                 self._execute()
 
+    def _check_anomalies(self, now: float):
+        for k, anomaly in self.anomaly_detector.check(list(self.counter_total_map.items()), now):
+            data = {"pulse": self.key, "counter": k}
+            if type(k) is tuple:
+                data["counter"], data["labels"] = k[0], format_labels(k[1])
+            data["direction"] = anomaly["direction"]
+            data["rate"] = round(anomaly["rate"], 3)
+            data["baseline"] = round(anomaly["baseline"], 3)
+
+            log_function = critical if anomaly["level"] == logging.CRITICAL else warning
+            log_function("Pulse Anomaly", data)
+
     def _execute(self):
         # The interval has come, so we can send the messages.
+        self._time_end_str = self._get_time_str()
+        counter_data, gauge_data = self._collect()
+
+        if self.aggregator_address is not None:
+            # The aggregator keeps the last value of each gauge, and pushes come every second, so a gauge that
+            # wasn't set this interval is pushed with its last value, not the 0 it was reset to.
+            gauge_data.update(self.gauge_last_map)
+            self._push(counter_data, gauge_data)
+        else:
+            info("{} Pulse {}".format(self.HEART, self.HEART), self._build_report(counter_data, gauge_data))
+
+        # Reset all parameters.
+        self._time_start_str = self._get_time_str()
+        self._prev_time = time.time()
+
+    def _collect(self) -> Tuple[Dict, Dict]:
+        """ Take the values for this interval, and reset them for the next. """
         counter_data = {}
         gauge_data = {}
 
-        self._time_end_str = self._get_time_str()
-
         for k, v in self.counter_map.items():
             counter_data[k] = v
             self.counter_map[k] = 0
@@ -101,38 +314,115 @@ class Pulse:
             gauge_data[k] = v
             self.gauge_map[k] = 0
 
-        info("{} Pulse {}".format(self.HEART, self.HEART), {
+        for k, collector in self.collector_map.items():
+            gauge_data[k] = collector()
+
+        return counter_data, gauge_data
+
+    def _build_report(self, counter_data: Dict, gauge_data: Dict) -> Dict:
+        return {
             "t_from": self._time_start_str,
             "t_stop": self._time_end_str,
-            "counter": counter_data,
-            "gauge": gauge_data,
+            "counter": nest_labels(counter_data),
+            "gauge": nest_labels(gauge_data),
+        }
+
+    def _push(self, counter_data: Dict, gauge_data: Dict):
+        message = json.dumps({
+            "worker": str(os.getpid()),
+            "pulse": self.key,
+            "counter": encode_series(counter_data),
+            "gauge": encode_series(gauge_data),
         })
-
-        # Reset all parameters.
-        self._time_start_str = self._get_time_str()
-        self._prev_time = time.time()
+        try:
+            self._aggregator_socket.sendto(message.encode("utf-8"), self.aggregator_address)
+        except Exception as e:
+            warning("Unable to push Pulse to the aggregator", {"key": self.key, "error": str(e)})
 
     @staticmethod
     def _get_time_str():
         return time.strftime('%d %b %H:%M')
 
 
+def nest_labels(data: Dict) -> Dict:
+    """ Report each labeled series under its key, as {key: {"name=value,...": value}}. """
+    nested = {}
+    for k, v in data.items():
+        if type(k) is tuple:
+            key, label_set = k
+            series = nested.get(key)
+            if type(series) is not dict:
+                series = nested[key] = {}
+            series[format_labels(label_set)] = v
+        elif type(nested.get(k)) is not dict:
+            nested[k] = v
+    return nested
+
+
+def encode_series(data: Dict) -> Dict:
+    """ Make the series JSON safe, by encoding each labeled series as a "labeled" list entry. """
+    encoded = {}
+    labeled = []
+    for k, v in data.items():
+        if type(k) is tuple:
+            labeled.append([k[0], k[1], v])
+        else:
+            encoded[k] = v
+
+    if labeled:
+        encoded[LABELED_KEY] = labeled
+    return encoded
+
+
+def decode_series(data: Dict) -> Dict:
+    """ The labeled series are keyed by a (key, label set) tuple again. The label sets are not interned here,
+    but by whichever Pulse admits them. """
+    decoded = dict(data)
+    for key, label_set, v in decoded.pop(LABELED_KEY, []):
+        label_set = tuple((str(pair[0]), str(pair[1])) for pair in label_set)
+        decoded[(key, LABEL_SET_MAP.get(label_set, label_set))] = v
+    return decoded
+
+
 def get(key: str="default"):
     if key not in PULSE_MAP:
-        PULSE_MAP[key] = Pulse(key)
+        pulse = Pulse(key)
+        if key == DEFAULT_PULSE_KEY:
+            _add_logger_collectors(pulse)
+        PULSE_MAP[key] = pulse
     return PULSE_MAP[key]
 
 
+def _add_logger_collectors(pulse: Pulse):
+    """ The default Pulse also reports on the health of the logger's own sinks. """
+    logger = get_instance()
+    if logger.socket_logger is not None:
+        pulse.add_collector("socket_logger", logger.socket_logger.stats)
+    if logger.self_metrics is not None:
+        pulse.add_collector("logkit", logger.get_self_metrics)
+
+
 def set_interval(interval_unit: str, interval_value: int):
     pulse = get(DEFAULT_PULSE_KEY)
     pulse.set_interval(interval_unit, interval_value)
 
 
-def increment(key: str, delta: Union[float, int]=1):
+def set_anomaly_detection(factor: float=3.0, critical_factor: float=10.0, min_rate: float=1.0, alpha: float=0.02,
+                          warmup: int=30):
+    pulse = get(DEFAULT_PULSE_KEY)
+    pulse.set_anomaly_detection(factor, critical_factor, min_rate, alpha, warmup)
+
+
+def set_aggregator(address: Union[str, Tuple[str, int]], push_interval: int=1):
+    pulse = get(DEFAULT_PULSE_KEY)
+    pulse.set_aggregator(address, push_interval)
+
+
+def increment(key: str, delta: Union[float, int]=1, labels: Union[Dict, tuple]=None):
     pulse = get(DEFAULT_PULSE_KEY)
-    pulse.increment(key, delta)
+    pulse.increment(key, delta, labels)
 
 
-def gauge(key: str, value: Union[float, int]=1):
+def gauge(key: str, value: Union[float, int]=1, labels: Union[Dict, tuple]=None):
     pulse = get(DEFAULT_PULSE_KEY)
-    pulse.gauge(key, value)
+    pulse.gauge(key, value, labels)
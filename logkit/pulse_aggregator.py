@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+Combines the Pulse of several worker processes into a single report. Each worker calls
+pulse.set_aggregator(address) and then pushes its interval deltas to the aggregator over a local
+datagram socket. The aggregator adds them up, and reports them as one Pulse on its own interval.
+
+Counters are added up. Each worker's gauges hold their last pushed value, and are added up too, except
+for those that only make sense per worker (such as the logger's own health collectors), which are
+reported under the ID of each worker instead.
+"""
+
+import json
+import os
+import socket
+import threading
+from typing import Iterable, Union, Dict, Tuple
+
+from logkit.pulse import Pulse, nest_labels, decode_series
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class PulseAggregator(Pulse):
+
+    RECV_SIZE = 65536
+
+    # Gauges that describe each worker, and that can't be added up (such as a backoff or a latency).
+    PER_WORKER_GAUGES = ("socket_logger", "logkit")
+
+    def __init__(self, key: str, address: Union[str, Tuple[str, int]]=("127.0.0.1", 0),
+                 interval_unit: str="m", interval_value: int=15, with_breakdown: bool=False,
+                 per_worker_gauges: Iterable[str]=PER_WORKER_GAUGES):
+
+        # Bind first, so that workers can push as soon as we exist.
+        family = socket.AF_UNIX if type(address) is str else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_DGRAM)
+        self.socket.bind(address)
+        self.address = address if type(address) is str else self.socket.getsockname()
+
+        # Worker ID -> {"counter": ..., "gauge": ...} for the current interval.
+        self.with_breakdown = with_breakdown
+        self.worker_map = {}
+        self.last_breakdown = {}
+        self.worker_gauge_map = {}  # The latest gauges pushed by each worker.
+        self.pushed_gauge_map = {}  # Every labeled gauge series the workers have pushed, for the cardinality cap.
+        self.per_worker_gauges = frozenset(per_worker_gauges)
+        self.lock = threading.Lock()
+
+        super().__init__(key, interval_unit, interval_value)
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def close(self):
+        self.socket.close()
+        if type(self.address) is str and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def _after_fork_in_child(self):
+        # The bound socket and the workers' pushes belong to the parent, so the child stays idle, and has
+        # nothing to report on shutdown.
+        self.lock = threading.Lock()
+        self.is_running = False
+        super()._after_fork_in_child()
+        for worker_map in (self.worker_map, self.last_breakdown, self.worker_gauge_map, self.pushed_gauge_map):
+            worker_map.clear()
+
+    def _has_values(self) -> bool:
+        with self.lock:
+            return super()._has_values() or len(self.worker_map) > 0
+
+    def breakdown(self) -> Dict:
+        """ The per-worker values of the current interval so far. """
+        with self.lock:
+            return _nest_breakdown(self.worker_map)
+
+    def _receive(self):
+        while True:
+            try:
+                data = self.socket.recv(self.RECV_SIZE)
+            except OSError:
+                break
+
+            try:
+                self._merge(json.loads(data.decode("utf-8")))
+            except (ValueError, KeyError):
+                continue
+
+    def _merge(self, push: Dict):
+        counter_data = decode_series(push["counter"])
+        gauge_data = decode_series(push["gauge"])
+
+        with self.lock:
+            # The pushed series count towards the same cap as the ones recorded here.
+            counter_data = self._admit(counter_data, self.counter_total_map, self.counter_label_count_map, True)
+            gauge_data = self._admit(gauge_data, self.pushed_gauge_map, self.gauge_label_count_map, False)
+
+            worker = self.worker_map.setdefault(push["worker"], {"counter": {}, "gauge": {}})
+            _add_values(worker["counter"], counter_data)
+            worker["gauge"].update(gauge_data)
+
+            # Keep the cumulative values up to date for scraping.
+            for k, v in counter_data.items():
+                if type(v) in (int, float):
+                    self.counter_total_map[k] = self.counter_total_map.get(k, 0) + v
+            self.worker_gauge_map.setdefault(push["worker"], {}).update(gauge_data)
+
+    def _admit(self, data: Dict, series_map: Dict, label_count_map: Dict, is_counter: bool) -> Dict:
+        """ Map each pushed labeled series to its own key, or to the overflow series of its metric. """
+        admitted = {}
+        for k, v in data.items():
+            if type(k) is not tuple:
+                admitted[k] = v
+                continue
+
+            k = self._series(k[0], k[1], series_map, label_count_map)
+            if is_counter:
+                admitted[k] = admitted.get(k, 0) + v
+            else:
+                series_map[k] = None
+                admitted[k] = v
+        return admitted
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        counter_totals, gauges = super().snapshot()
+        with self.lock:
+            for worker_id, gauge_data in self.worker_gauge_map.items():
+                self._add_gauges(gauges, worker_id, gauge_data)
+        return counter_totals, gauges
+
+    def _add_gauges(self, target: Dict, worker_id: str, gauge_data: Dict):
+        for k, v in gauge_data.items():
+            if k in self.per_worker_gauges:
+                target.setdefault(k, {})[worker_id] = v
+            else:
+                _add_values(target, {k: v})
+
+    def _collect(self) -> Tuple[Dict, Dict]:
+        # Values recorded by this process itself, plus everything the workers pushed.
+        counter_data, gauge_data = super()._collect()
+
+        with self.lock:
+            worker_map = self.worker_map
+            self.worker_map = {}
+
+        for worker_id, worker in worker_map.items():
+            _add_values(counter_data, worker["counter"])
+            self._add_gauges(gauge_data, worker_id, worker["gauge"])
+
+        self.last_breakdown = worker_map
+        return counter_data, gauge_data
+
+    def _build_report(self, counter_data: Dict, gauge_data: Dict) -> Dict:
+        report = super()._build_report(counter_data, gauge_data)
+        report["n_workers"] = len(self.last_breakdown)
+        if self.with_breakdown:
+            report["workers"] = _nest_breakdown(self.last_breakdown)
+        return report
+
+
+def _nest_breakdown(worker_map: Dict) -> Dict:
+    return {k: {"counter": nest_labels(v["counter"]), "gauge": nest_labels(v["gauge"])} for k, v in worker_map.items()}
+
+
+def _add_values(target: Dict, source: Dict):
+    """ Add the numeric values (and nested dicts of them) from the source into the target. """
+    for k, v in source.items():
+        if type(v) is dict:
+            _add_values(target.setdefault(k, {}), v)
+        elif type(v) in (int, float) and type(target.get(k, 0)) in (int, float):
+            target[k] = target.get(k, 0) + v
+        else:
+            target[k] = v
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+A reference receiver for the SocketLogger. It accepts every transport and protocol that the
+SocketLogger can send, acknowledges frames that ask for it, and collects the received records.
+It is meant for tests, benchmarks and local debugging, not as a production collector.
+"""
+
+import socket
+import threading
+import time
+from typing import Callable, List
+
+from logkit import protocol as framing
+from logkit.socket_logger import SocketLogger
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class Receiver:
+
+    RECV_SIZE = 65536
+
+    def __init__(self, host: str="127.0.0.1", port: int=0, transport: str=SocketLogger.TCP, path: str=None,
+                 protocol: str=SocketLogger.LINES, on_record: Callable[[bytes], None]=None,
+                 keep_records: bool=True):
+
+        self.host = host
+        self.port = port
+        self.transport = transport
+        self.path = path
+        self.protocol = protocol
+        self.on_record = on_record
+        self.keep_records = keep_records
+
+        family, socket_type = SocketLogger.TRANSPORTS[transport]
+        self.is_datagram = socket_type == socket.SOCK_DGRAM
+        self.socket = socket.socket(family, socket_type)
+
+        # Received data.
+        self.lock = threading.Lock()
+        self.records = []
+        self.n_records = 0
+        self.n_frames = 0
+        self.n_bytes = 0
+        self.is_running = False
+
+    @property
+    def address(self):
+        if self.transport in (SocketLogger.UNIX, SocketLogger.UNIX_DGRAM):
+            return self.path
+        return self.socket.getsockname()
+
+    def start(self) -> "Receiver":
+        if self.transport in (SocketLogger.UNIX, SocketLogger.UNIX_DGRAM):
+            self.socket.bind(self.path)
+        else:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.bind((self.host, self.port))
+
+        self.is_running = True
+        if self.is_datagram:
+            threading.Thread(target=self._receive_datagrams, daemon=True).start()
+        else:
+            self.socket.listen(8)
+            threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.is_running = False
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+
+    def wait_for(self, n_records: int, timeout: float=5) -> bool:
+        """ Wait until at least n_records have been received. """
+        deadline = time.time() + timeout
+        while self.n_records < n_records:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _add(self, records: List[bytes], n_bytes: int, is_frame: bool):
+        with self.lock:
+            if self.keep_records:
+                self.records.extend(records)
+            self.n_records += len(records)
+            self.n_bytes += n_bytes
+            if is_frame:
+                self.n_frames += 1
+
+        if self.on_record is not None:
+            for record in records:
+                self.on_record(record)
+
+    def _accept(self):
+        while self.is_running:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                break
+            target = self._receive_frames if self.protocol == SocketLogger.FRAMED else self._receive_lines
+            threading.Thread(target=target, args=(connection,), daemon=True).start()
+
+    def _receive_lines(self, connection):
+        buffer = b""
+        with connection:
+            while True:
+                try:
+                    data = connection.recv(self.RECV_SIZE)
+                except OSError:
+                    break
+                if not data:
+                    break
+
+                buffer += data
+                records = buffer.split(framing.DELIMITER)
+                buffer = records.pop()
+                self._add(records, len(data), is_frame=False)
+
+    def _receive_frames(self, connection):
+        with connection:
+            while True:
+                try:
+                    header, records = framing.read_frame(connection)
+                except (OSError, framing.ProtocolError):
+                    break
+                if header is None:
+                    break
+
+                self._add(records, framing.HEADER.size + header.size, is_frame=True)
+                if header.ack:
+                    connection.sendall(framing.encode_ack(header.sequence))
+
+    def _receive_datagrams(self):
+        while self.is_running:
+            try:
+                data = self.socket.recv(self.RECV_SIZE)
+            except OSError:
+                break
+
+            if self.protocol == SocketLogger.FRAMED:
+                try:
+                    _, records = framing.decode_frame(data)
+                except framing.ProtocolError:
+                    continue
+                self._add(records, len(data), is_frame=True)
+            else:
+                records = data.split(framing.DELIMITER)
+                if records and records[-1] == b"":
+                    records.pop()
+                self._add(records, len(data), is_frame=False)
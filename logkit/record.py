@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+A single log event, shared by every sink. The timestamp, level name and the formatted line are
+each computed at most once per record, and the timestamp string is memoized per second.
+"""
+
+import logging
+import time
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+ISO_TIME_FMT = "%Y-%m-%dT%H:%M:%S%z"
+EMPTY_DATA = "{}"
+SEPARATOR = "::"
+
+LEVEL_NAMES = {
+    logging.DEBUG: "DEBUG",
+    logging.INFO: "INFO",
+    logging.WARNING: "WARNING",
+    logging.ERROR: "ERROR",
+    logging.CRITICAL: "CRITICAL",
+}
+
+# (epoch second, formatted string) of the most recent timestamp. Swapped as a whole tuple so
+# that concurrent readers never see a mismatched pair.
+_last_timestamp = (None, None)
+
+
+def format_timestamp(created: float) -> str:
+    """ Format an epoch time as an ISO string, re-using the previous result within the same second. """
+    global _last_timestamp
+    second = int(created)
+    cached_second, cached_string = _last_timestamp
+    if second == cached_second:
+        return cached_string
+
+    time_string = time.strftime(ISO_TIME_FMT, time.localtime(second))
+    _last_timestamp = (second, time_string)
+    return time_string
+
+
+def level_name(level: int) -> str:
+    name = LEVEL_NAMES.get(level)
+    if name is None:
+        name = logging.getLevelName(level).upper()
+    return name
+
+
+def format_body(message, module_trace, data_string) -> str:
+    """ The trace, message and data portion of a log line. """
+    if data_string is None:
+        data_string = EMPTY_DATA
+
+    if module_trace is None:
+        return "{}{}{}".format(message, SEPARATOR, data_string)
+
+    return "{}{}{}{}{}".format(module_trace, SEPARATOR, message, SEPARATOR, data_string)
+
+
+class Record:
+
+    __slots__ = ("level", "message", "module_trace", "data_string", "created", "_body", "_line", "_encoded")
+
+    def __init__(self, level: int, message, module_trace: str=None, data_string: str=None, created: float=None):
+        self.level = level
+        self.message = message
+        self.module_trace = module_trace
+        self.data_string = data_string
+        self.created = time.time() if created is None else created
+
+        # Lazily formatted fields.
+        self._body = None
+        self._line = None
+        self._encoded = None
+
+    @property
+    def level_name(self) -> str:
+        return level_name(self.level)
+
+    @property
+    def timestamp(self) -> str:
+        return format_timestamp(self.created)
+
+    @property
+    def body(self) -> str:
+        """ The record without level and time: 'trace::message::data'. """
+        if self._body is None:
+            self._body = format_body(self.message, self.module_trace, self.data_string)
+        return self._body
+
+    @property
+    def line(self) -> str:
+        """ The full record: 'LEVEL::time::trace::message::data'. """
+        if self._line is None:
+            self._line = "{}{}{}{}{}".format(self.level_name, SEPARATOR, self.timestamp, SEPARATOR, self.body)
+        return self._line
+
+    @property
+    def encoded(self) -> bytes:
+        """ The full record as newline terminated UTF-8, ready to be written to a stream. """
+        if self._encoded is None:
+            self._encoded = (self.line + "\n").encode("utf-8")
+        return self._encoded
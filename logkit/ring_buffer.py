@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+A fixed-size ring of recent log records, kept without any formatting. The logger holds back the
+records below the file log level here, and only formats and writes them out when a record at the
+trigger level arrives, so that an error comes with the debug history that led up to it.
+"""
+
+import logging
+import threading
+from typing import List
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class BufferedRecord:
+
+    __slots__ = ("level", "message", "data", "module_trace", "created")
+
+    def __init__(self):
+        self.level = 0
+        self.message = None
+        self.data = None
+        self.module_trace = None
+        self.created = None
+
+
+class RingBuffer:
+
+    def __init__(self, size: int=1000, trigger_level: int=logging.ERROR):
+        self.size = size
+        self.trigger_level = trigger_level
+
+        # The slots are allocated once, and overwritten in place.
+        self.slots = [BufferedRecord() for _ in range(size)]
+        self.index = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, level: int, message, data, module_trace: str, created: float):
+        """ Keep the raw record, overwriting the oldest one if the ring is full. The data is not copied. """
+        with self.lock:
+            slot = self.slots[self.index]
+            slot.level = level
+            slot.message = message
+            slot.data = data
+            slot.module_trace = module_trace
+            slot.created = created
+            self.index = (self.index + 1) % self.size
+            if self.count < self.size:
+                self.count += 1
+
+    def drain(self) -> List[tuple]:
+        """ Remove and return every held record as (level, message, data, module_trace, created), oldest first. """
+        with self.lock:
+            start = (self.index - self.count) % self.size
+            records = []
+            for i in range(self.count):
+                slot = self.slots[(start + i) % self.size]
+                records.append((slot.level, slot.message, slot.data, slot.module_trace, slot.created))
+                slot.message = None
+                slot.data = None
+            self.count = 0
+            return records
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+Routes records to their destinations by level and by the module that logged them. The rules come from
+ROUTING__RULES in logkit.env, separated by ';', and each one has the form:
+
+    LEVELS[@MODULE,...]>DESTINATION,...
+
+LEVELS is a level name (DEBUG), a level and everything above it (ERROR+), or every level (*). Modules
+match the module's name (__name__), or the logger's name for records from the standard logging bridge,
+including any sub-modules. A destination is 'console', 'file' (the main log file), 'socket', a path to a
+file of its own, 'default' (wherever the record would have gone without routing), or 'drop'. For example:
+
+    ERROR+>default,./logs/error.log;*@urllib3,botocore>drop;DEBUG>./logs/debug.log
+
+The first rule that matches a record decides where it goes, and records that match no rule are logged
+as usual. The rules are compiled into a table per level when the config is loaded, and the route of
+each module is looked up once, and then cached.
+"""
+
+import logging
+from typing import Callable, List, Tuple
+
+from logkit.record import LEVEL_NAMES
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+RULE_SEPARATOR = ";"
+CONSOLE = "console"
+FILE = "file"
+SOCKET = "socket"
+DEFAULT = "default"
+DROP = "drop"
+ALL_LEVELS = "*"
+
+
+class Route:
+
+    __slots__ = ("is_default", "console", "file", "socket", "sinks")
+
+    def __init__(self, is_default: bool=False, console: bool=False, file: bool=False, socket: bool=False,
+                 sinks: tuple=()):
+        self.is_default = is_default
+        self.console = console
+        self.file = file
+        self.socket = socket
+        self.sinks = sinks
+
+    @property
+    def is_dropped(self) -> bool:
+        return not (self.is_default or self.console or self.file or self.socket or self.sinks)
+
+
+DEFAULT_ROUTE = Route(is_default=True)
+
+
+class Rule:
+
+    __slots__ = ("levels", "modules", "destinations")
+
+    def __init__(self, levels: Tuple[int, ...], modules: Tuple[str, ...], destinations: Tuple[str, ...]):
+        self.levels = levels
+        self.modules = modules
+        self.destinations = destinations
+
+
+def parse_rules(text: str) -> List[Rule]:
+    """ Parse the ';' separated rules. Raises a ValueError for a rule that doesn't make sense. """
+    rules = []
+    for rule_text in text.split(RULE_SEPARATOR):
+        rule_text = rule_text.strip()
+        if len(rule_text) == 0:
+            continue
+
+        if ">" not in rule_text:
+            raise ValueError("Routing rule '{}' has no '>' before its destinations.".format(rule_text))
+        match_text, destination_text = rule_text.split(">", 1)
+
+        modules = ()
+        if "@" in match_text:
+            match_text, module_text = match_text.split("@", 1)
+            modules = tuple(m.strip() for m in module_text.split(",") if len(m.strip()) > 0)
+            if len(modules) == 0:
+                raise ValueError("Routing rule '{}' has no modules after '@'.".format(rule_text))
+
+        destinations = tuple(d.strip() for d in destination_text.split(",") if len(d.strip()) > 0)
+        if len(destinations) == 0:
+            raise ValueError("Routing rule '{}' has no destinations.".format(rule_text))
+        if DROP in destinations and len(destinations) > 1:
+            raise ValueError("Routing rule '{}' can't both drop and send records.".format(rule_text))
+
+        rules.append(Rule(_parse_levels(match_text.strip(), rule_text), modules, destinations))
+    return rules
+
+
+def _parse_levels(level_text: str, rule_text: str) -> Tuple[int, ...]:
+    if level_text == ALL_LEVELS:
+        return tuple(LEVEL_NAMES)
+
+    and_above = level_text.endswith("+")
+    level = logging._nameToLevel.get(level_text.rstrip("+").upper())
+    if level not in LEVEL_NAMES:
+        raise ValueError("Routing rule '{}' has an unknown level: {}".format(rule_text, level_text))
+
+    if and_above:
+        return tuple(l for l in LEVEL_NAMES if l >= level)
+    return level,
+
+
+class Router:
+
+    def __init__(self, rules: List[Rule], create_sink: Callable[[str], object]):
+        # The sink of each file path, shared by every rule that writes to it.
+        self.sink_map = {}
+
+        # Level -> (rule index, route) of the first rule for every module, and module -> (rule index, route).
+        self.level_route_map = {}
+        self.module_route_map = {level: {} for level in LEVEL_NAMES}
+
+        for index, rule in enumerate(rules):
+            route = self._build_route(rule, create_sink)
+            for level in rule.levels:
+                if level in self.level_route_map:
+                    # An earlier rule already takes every module at this level.
+                    continue
+                if len(rule.modules) == 0:
+                    self.level_route_map[level] = (index, route)
+                    continue
+                for module in rule.modules:
+                    self.module_route_map[level].setdefault(module, (index, route))
+
+        # Level -> module -> route, filled in as each module logs for the first time.
+        self.route_cache_map = {level: {} for level in LEVEL_NAMES}
+
+    @property
+    def sinks(self) -> list:
+        return list(self.sink_map.values())
+
+    def _build_route(self, rule: Rule, create_sink: Callable[[str], object]) -> Route:
+        route = Route()
+        sinks = []
+        for destination in rule.destinations:
+            if destination == DEFAULT:
+                route.is_default = True
+            elif destination == CONSOLE:
+                route.console = True
+            elif destination == FILE:
+                route.file = True
+            elif destination == SOCKET:
+                route.socket = True
+            elif destination != DROP:
+                sink = self.sink_map.get(destination)
+                if sink is None:
+                    sink = self.sink_map[destination] = create_sink(destination)
+                sinks.append(sink)
+        route.sinks = tuple(sinks)
+
+        # The default destinations already include the console, file and socket.
+        if route.is_default:
+            route.console = route.file = route.socket = False
+        return route
+
+    def route(self, level: int, module: str) -> Route:
+        route_cache = self.route_cache_map.get(level)
+        if route_cache is None:
+            return DEFAULT_ROUTE
+
+        route = route_cache.get(module)
+        if route is None:
+            route = route_cache[module] = self._match(level, module)
+        return route
+
+    def _match(self, level: int, module: str) -> Route:
+        """ The route of the first rule that matches this module, or any of the packages that contain it. """
+        best = self.level_route_map.get(level, (float("inf"), DEFAULT_ROUTE))
+        module_routes = self.module_route_map[level]
+        if len(module_routes) > 0 and module is not None:
+            parts = str(module).split(".")
+            for i in range(len(parts), 0, -1):
+                entry = module_routes.get(".".join(parts[:i]))
+                if entry is not None and entry[0] < best[0]:
+                    best = entry
+        return best[1]
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+Optional metrics about logkit itself: how long each sink takes to write a record, how many records
+and bytes each sink has handled, and how long the logger spends capturing the call-site and
+serializing the data. When they are turned off, the logger skips all of this.
+"""
+
+import bisect
+import threading
+from typing import Dict
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class Histogram:
+
+    # Upper bounds of each bucket, in seconds. The last bucket catches everything slower.
+    BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0)
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """ The upper bound of the bucket that holds this quantile. """
+        if self.count == 0:
+            return 0.0
+
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count * 1e6 if self.count > 0 else 0.0,
+            "p50_us": self.quantile(0.5) * 1e6,
+            "p99_us": self.quantile(0.99) * 1e6,
+            "max_us": self.max * 1e6,
+        }
+
+
+class SinkMetrics:
+
+    __slots__ = ("latency", "batch_latency", "records", "bytes")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.batch_latency = None  # Only for the sinks that write in batches.
+        self.records = 0
+        self.bytes = 0
+
+    def snapshot(self) -> Dict:
+        snapshot = {"records": self.records, "bytes": self.bytes, "latency": self.latency.snapshot()}
+        if self.batch_latency is not None:
+            snapshot["batch_latency"] = self.batch_latency.snapshot()
+        return snapshot
+
+
+class SelfMetrics:
+
+    FILE = "file"
+    SOCKET = "socket"  # The send on the socket logger's sender thread.
+    SOCKET_ENQUEUE = "socket_enqueue"  # Handing the record to the socket logger's queue.
+    CONSOLE = "console"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sink_map = {}
+        self.capture = Histogram()
+        self.serialize = Histogram()
+
+    def observe_sink(self, sink: str, seconds: float, n_bytes: int=0):
+        with self.lock:
+            metrics = self.sink_map.get(sink)
+            if metrics is None:
+                metrics = self.sink_map[sink] = SinkMetrics()
+            metrics.latency.observe(seconds)
+            metrics.records += 1
+            metrics.bytes += n_bytes
+
+    def observe_batch(self, sink: str, seconds: float, n_records: int, n_bytes: int=0):
+        """ A batch of records written at once. The latency is observed per batch, and per record. """
+        with self.lock:
+            metrics = self.sink_map.get(sink)
+            if metrics is None:
+                metrics = self.sink_map[sink] = SinkMetrics()
+            if metrics.batch_latency is None:
+                metrics.batch_latency = Histogram()
+            metrics.batch_latency.observe(seconds)
+            if n_records > 0:
+                metrics.latency.observe(seconds / n_records)
+            metrics.records += n_records
+            metrics.bytes += n_bytes
+
+    def observe_capture(self, seconds: float):
+        with self.lock:
+            self.capture.observe(seconds)
+
+    def observe_serialize(self, seconds: float):
+        with self.lock:
+            self.serialize.observe(seconds)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                "capture": self.capture.snapshot(),
+                "serialize": self.serialize.snapshot(),
+                "sink": {k: v.snapshot() for k, v in self.sink_map.items()},
+            }
@@ -3,38 +3,140 @@
 """
 This is a helper module that sends messages over a socket, if the socket is open and available.
 If not, it will fail silently.
+
+Messages are queued and shipped in batches by a single background thread. Stream transports (TCP and
+Unix stream sockets) frame each message with a newline. Datagram transports (UDP and Unix datagram
+sockets) pack as many newline terminated messages into each datagram as will fit, and drop (and count)
+any message that is too large for a datagram of its own.
+
+With the 'framed' protocol, each batch is instead wrapped in a length-framed, optionally compressed
+frame (see logkit.protocol), and the receiver can acknowledge each frame.
+
+Failed connections back off exponentially with jitter. Messages sent while backing off are dropped
+and counted, and the warnings about it are rate-limited. See stats() for the running totals.
+
+A forked child does not share the parent's socket. It starts with its own empty queue, sender thread
+and totals, and connects on its first send.
 """
 import logging
+import queue
+import random
 import socket
 import time
 import threading
+from typing import Union, List, Tuple
+
+from logkit import protocol as framing
+from logkit.utils import fork
+
+# The socket's own failures go to a 'logkit.' logger, which the stdlib bridge never feeds back into the socket.
+_logger = logging.getLogger(__name__)
 
 
 class SocketLogger:
-    def __init__(self, host: str, port: int):
+
+    # Transports.
+    TCP = "tcp"
+    UDP = "udp"
+    UNIX = "unix"
+    UNIX_DGRAM = "unix_dgram"
+
+    TRANSPORTS = {
+        TCP: (socket.AF_INET, socket.SOCK_STREAM),
+        UDP: (socket.AF_INET, socket.SOCK_DGRAM),
+        UNIX: (getattr(socket, "AF_UNIX", None), socket.SOCK_STREAM),
+        UNIX_DGRAM: (getattr(socket, "AF_UNIX", None), socket.SOCK_DGRAM),
+    }
+
+    # Protocols.
+    LINES = "lines"
+    FRAMED = "framed"
+
+    DELIMITER = b"\n"
+    WARNING_INTERVAL = 10  # Minimum seconds between repeated warnings of the same kind.
+    MAX_DATAGRAM_SIZE = 8192  # Safe for UDP on loopback and for the default AF_UNIX buffers.
+
+    def __init__(self, host: str="127.0.0.1", port: int=5000, transport: str=TCP, path: str=None,
+                 timeout: float=15, batch_size: int=64, max_queue_size: int=10000,
+                 protocol: str=LINES, compression: str=framing.AUTO, ack: bool=False):
+
+        if transport not in self.TRANSPORTS:
+            raise ValueError("Unknown socket transport: {}".format(transport))
+
+        if self.TRANSPORTS[transport][0] is None:
+            raise ValueError("Transport {} is not supported on this platform.".format(transport))
+
+        if transport in (self.UNIX, self.UNIX_DGRAM) and path is None:
+            raise ValueError("Transport {} requires a socket path.".format(transport))
+
+        if protocol not in (self.LINES, self.FRAMED):
+            raise ValueError("Unknown socket protocol: {}".format(protocol))
+
+        if ack and (protocol != self.FRAMED or self.TRANSPORTS[transport][1] != socket.SOCK_STREAM):
+            raise ValueError("Acknowledgments require the framed protocol over a stream transport.")
 
         # Back-off mechanism.
         self.current_backoff = 1
         self.prev_back_off_time = 0
         self.max_back_off = 64
+        self.n_failures = 0
         self.lock = threading.Lock()
 
-        # Socket.
-        socket.setdefaulttimeout(15)
+        # Statistics.
+        self.stats_lock = threading.Lock()
+        self._reset_stats()
+
+        # Rate-limited warnings: kind -> [last warning time, suppressed since].
+        self.warning_map = {}
+
+        # Socket. The timeout applies to this socket only.
+        self.transport = transport
         self.host = host
         self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.is_datagram = self.TRANSPORTS[transport][1] == socket.SOCK_DGRAM
         self.socket = None
+
+        # Framing.
+        self.protocol = protocol
+        self.compression = framing.resolve_codec(compression) if protocol == self.FRAMED else framing.NONE
+        self.ack = ack
+        self.sequence = 0
+        self.last_acked_sequence = None
+
+        # Optional self metrics, set by the logger: times each batch the sender thread sends.
+        self.self_metrics = None
+
         self.connect()
 
+        # Outgoing messages, drained in batches by the sender thread. An entry may hold many records (from
+        # send_many), so the queue is bounded by the number of records that are pending, not of entries.
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.n_pending = 0
+        self.queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+        fork.register(self)
+
+    @property
+    def address(self):
+        if self.transport in (self.UNIX, self.UNIX_DGRAM):
+            return self.path
+        return self.host, self.port
+
     def backoff(self):
-        # Apply the back-off counter.
-        self.current_backoff *= 2
-        if self.current_backoff > self.max_back_off:
-            self.current_backoff = self.max_back_off
+        # Exponential back-off with jitter, so that many clients don't reconnect in lock-step.
+        self.n_failures += 1
+        if self.disconnected_time is None:
+            self.disconnected_time = time.time()
+        limit = min(self.max_back_off, 2 ** self.n_failures)
+        self.current_backoff = random.uniform(limit / 2, limit)
         self.prev_back_off_time = time.time()
 
     def reset_backoff(self):
         # After a success, reset the current backoff back to 1.
+        self.n_failures = 0
         self.current_backoff = 1
 
     def is_backing_off(self):
@@ -44,57 +146,293 @@ class SocketLogger:
             return False
 
         # It's still in the back-off phase.
-        logging.warning("Socket backing off. Duration: {:.2f} - Limit: {}".format(
+        self.warn("backoff", "Socket backing off. Duration: {:.2f} - Limit: {:.2f}".format(
             backoff_duration,
             self.current_backoff
         ))
         return True
 
+    def warn(self, kind: str, message: str, level: int=logging.WARNING):
+        """ Log a warning, unless one of the same kind was logged in the last WARNING_INTERVAL seconds. """
+        now = time.time()
+        with self.stats_lock:
+            entry = self.warning_map.setdefault(kind, [0, 0])
+            if now - entry[0] < self.WARNING_INTERVAL:
+                entry[1] += 1
+                return
+            suppressed = entry[1]
+            entry[0] = now
+            entry[1] = 0
+
+        if suppressed > 0:
+            message = "{} ({} similar messages suppressed)".format(message, suppressed)
+        _logger.log(level, message)
+
     def connect(self):
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.host, self.port))
+            family, socket_type = self.TRANSPORTS[self.transport]
+            self.socket = socket.socket(family, socket_type)
+            self.socket.settimeout(self.timeout)
+            self.socket.connect(self.address)
             self.reset_backoff()
+            self._on_connected()
         except Exception as e:
-            logging.error("Error: Unable to connect to socket: {}".format(str(e)))
+            self.warn("connect", "Error: Unable to connect to socket: {}".format(str(e)), logging.ERROR)
             if self.socket is not None:
                 self.socket.close()
                 self.socket = None
             self.backoff()
 
+    def _reset_stats(self):
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.records_dropped = 0
+        self.records_delivered = 0
+        self.reconnects = 0
+        self.reconnect_latency = None
+        self.disconnected_time = None
+
+    def _after_fork_in_child(self):
+        # The inherited locks may have been held by the parent's sender thread, which is gone.
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+        # Let go of the parent's connection without shutting it down, and connect on the first send.
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+        self.reset_backoff()
+        self.prev_back_off_time = 0
+        self.warning_map = {}
+        self._reset_stats()
+
+        # The parent sends whatever was already queued.
+        self.n_pending = 0
+        self.queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _on_connected(self):
+        if self.disconnected_time is None:
+            return
+
+        # This is a reconnection, so record how long we were without a socket.
+        with self.stats_lock:
+            self.reconnects += 1
+            self.reconnect_latency = time.time() - self.disconnected_time
+        self.disconnected_time = None
+
+    def _drop(self, n_records: int):
+        with self.stats_lock:
+            self.records_dropped += n_records
+
+    def stats(self) -> dict:
+        """ A snapshot of the queue depth and the running totals since the logger was created. """
+        with self.stats_lock:
+            return {
+                "queue_depth": self.n_pending,
+                "records_sent": self.records_sent,
+                "bytes_sent": self.bytes_sent,
+                "records_dropped": self.records_dropped,
+                "records_delivered": self.records_delivered,
+                "reconnects": self.reconnects,
+                "reconnect_latency": self.reconnect_latency,
+                "is_connected": self.socket is not None,
+                "backoff": self.current_backoff if self.n_failures > 0 else 0,
+            }
+
     def close(self):
         try:
             self.socket.close()
         except Exception as e:
-            logging.error("Warning: Unable to close socket: {}".format(str(e)))
+            _logger.error("Warning: Unable to close socket: {}".format(str(e)))
         self.socket = None
 
-    def send(self, message: str):
+    def send(self, message: Union[str, bytes]):
+
+        if self.is_backing_off():
+            self._drop(1)
+            return
+
+        # Delegate the actual sending to the sender thread. Drop the message if the queue is full.
+        if self._reserve(1) == 0:
+            self._drop(1)
+            self.warn("queue_full", "Socket queue is full. Dropping messages.")
+            return
+        self.queue.put_nowait(message)
+
+    def send_many(self, messages: List[Union[str, bytes]]):
+        """ Queue several messages as a single entry, which the sender thread ships with its next batch.
+        If the queue only has room for some of them, the rest are dropped. """
+        if len(messages) == 0:
+            return
 
         if self.is_backing_off():
+            self._drop(len(messages))
             return
 
-        # Delegate the actual sending to a daemon thread.
-        threading.Thread(target=self.threaded_send, args=[message], daemon=True).start()
+        n_queued = self._reserve(len(messages))
+        if n_queued < len(messages):
+            self._drop(len(messages) - n_queued)
+            self.warn("queue_full", "Socket queue is full. Dropping messages.")
+        if n_queued > 0:
+            self.queue.put_nowait(list(messages[:n_queued]))
+
+    def _reserve(self, n_records: int) -> int:
+        """ Count up to n_records as pending, as far as the queue has room for them. Returns how many. """
+        with self.stats_lock:
+            if self.max_queue_size > 0:
+                n_records = max(0, min(n_records, self.max_queue_size - self.n_pending))
+            self.n_pending += n_records
+        return n_records
+
+    def flush(self, timeout: float=None) -> bool:
+        """ Wait until every queued message has been handled. Returns False if the timeout expired first. """
+        deadline = None if timeout is None else time.time() + timeout
+        while self.n_pending > 0:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
 
-    def threaded_send(self, message: str):
+    def _loop(self):
+        while True:
+            # Block for the first entry, then take whatever else is already waiting. Each entry is a
+            # message, or a list of them from send_many.
+            entries = [self.queue.get()]
+            while len(entries) < self.batch_size:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            messages = []
+            for entry in entries:
+                if type(entry) is list:
+                    messages.extend(entry)
+                else:
+                    messages.append(entry)
+
+            try:
+                self.send_batch(messages)
+            finally:
+                with self.stats_lock:
+                    self.n_pending -= len(messages)
+                for _ in entries:
+                    self.queue.task_done()
+
+    def send_batch(self, messages: List[Union[str, bytes]]):
         lock = self.lock.acquire(blocking=True)
 
         # Could not acquire a lock in time.
         if not lock:
             return
+        n_unsent = len(messages)
+        n_bytes = 0
+        metrics = self.self_metrics
+        t_start = time.perf_counter() if metrics is not None else 0
         try:
             if self.socket is None:
                 self.connect()
 
             if self.socket is not None:
                 try:
-                    message += "\n"
-                    self.socket.sendall(bytes(message, "utf-8"))
+                    for payload, sequence, count in self._payloads(messages):
+                        if self.is_datagram:
+                            self.socket.send(payload)
+                        else:
+                            self.socket.sendall(payload)
+
+                        if self.ack:
+                            self._wait_for_ack(sequence)
+
+                        n_unsent -= count
+                        n_bytes += len(payload)
+                        with self.stats_lock:
+                            self.records_sent += count
+                            self.bytes_sent += len(payload)
+                            if self.ack:
+                                self.records_delivered += count
                     self.reset_backoff()
                 except Exception as e:
                     self.close()
-                    logging.error("Error: Unable to send socket message: {}".format(str(e)))
+                    self.warn("send", "Error: Unable to send socket message: {}".format(str(e)), logging.ERROR)
                     self.backoff()
         finally:
+            if n_unsent > 0:
+                self._drop(n_unsent)
             self.lock.release()
+            if metrics is not None:
+                metrics.observe_batch(metrics.SOCKET, time.perf_counter() - t_start, len(messages) - n_unsent, n_bytes)
+
+    def threaded_send(self, message: Union[str, bytes]):
+        self.send_batch([message])
+
+    def _wait_for_ack(self, sequence: int):
+        data = framing.recv_exactly(self.socket, framing.ACK.size)
+        if len(data) < framing.ACK.size:
+            raise ConnectionError("Socket closed before the frame was acknowledged.")
+
+        acked_sequence = framing.decode_ack(data)
+        if acked_sequence != sequence:
+            raise framing.ProtocolError("Expected ack for frame {}, got {}.".format(sequence, acked_sequence))
+        self.last_acked_sequence = acked_sequence
+
+    def _payloads(self, messages: List[Union[str, bytes]]) -> List[Tuple[bytes, int, int]]:
+        """ Split the messages into (payload, sequence, count) tuples, one per send on the transport. """
+        framed = []
+        for message in messages:
+            if type(message) is str:
+                message = bytes(message, "utf-8")
+            if not message.endswith(self.DELIMITER):
+                message += self.DELIMITER
+            framed.append(message)
+
+        # Stream sockets take the whole batch at once. Datagrams take as many messages as will fit.
+        if self.is_datagram:
+            max_size = self.MAX_DATAGRAM_SIZE
+            overhead = 0
+            if self.protocol == self.FRAMED:
+                # Framed records are prefixed with their length, in place of their newline.
+                max_size -= framing.HEADER.size
+                overhead = framing.RECORD_LENGTH.size - len(self.DELIMITER)
+
+            # A record that no datagram can carry would fail the send of the whole batch, so it is left
+            # out, and counted as dropped with the other unsent records.
+            fitting = [message for message in framed if len(message) + overhead <= max_size]
+            if len(fitting) < len(framed):
+                self.warn("oversized", "Dropping {} records larger than a datagram ({} bytes).".format(
+                    len(framed) - len(fitting), max_size))
+            chunks = self._chunk(fitting, max_size, overhead)
+        else:
+            chunks = [framed]
+
+        payloads = []
+        for chunk in chunks:
+            if self.protocol == self.FRAMED:
+                self.sequence = (self.sequence + 1) % framing.MAX_SEQUENCE
+                payload = framing.encode_frame(chunk, self.sequence, self.compression, self.ack)
+            else:
+                payload = b"".join(chunk)
+            payloads.append((payload, self.sequence, len(chunk)))
+        return payloads
+
+    @staticmethod
+    def _chunk(messages: List[bytes], max_size: int, overhead: int=0) -> List[List[bytes]]:
+        chunks = []
+        current = []
+        current_size = 0
+        for message in messages:
+            size = len(message) + overhead
+            if current and current_size + size > max_size:
+                chunks.append(current)
+                current = []
+                current_size = 0
+            current.append(message)
+            current_size += size
+
+        if current:
+            chunks.append(current)
+        return chunks
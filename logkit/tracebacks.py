@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Turns exceptions into bounded, structured log data. Each traceback is fingerprinted by its exception
+type and frames. The first occurrence is logged with its frames, and repeat occurrences only carry the
+fingerprint and a count, so that an exception thrown in a loop doesn't flood the logs.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Union
+
+from logkit.utils.truncate import truncate
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+class TracebackCache:
+
+    def __init__(self, max_frames: int=20, max_message_size: int=256, max_entries: int=1000):
+        self.max_frames = max_frames
+        self.max_message_size = max_message_size
+        self.max_entries = max_entries
+
+        # Fingerprint -> number of occurrences. The least recently seen fingerprint is evicted first.
+        self.count_map = OrderedDict()
+        self.lock = threading.Lock()
+
+    def capture(self, exc_info: tuple) -> Union[Dict, None]:
+        """ The log data for this (type, value, traceback), or None if there is no exception. """
+        exc_type, exc_value, exc_traceback = exc_info
+        if exc_type is None:
+            return None
+
+        frames = self._extract_frames(exc_traceback)
+        type_name = exc_type.__qualname__
+        fingerprint = self._fingerprint(type_name, frames)
+
+        with self.lock:
+            occurrences = self.count_map.pop(fingerprint, 0) + 1
+            self.count_map[fingerprint] = occurrences
+            if len(self.count_map) > self.max_entries:
+                self.count_map.popitem(last=False)
+
+        data = {
+            "type": type_name,
+            "message": truncate(str(exc_value), self.max_message_size),
+            "fingerprint": fingerprint,
+        }
+
+        if occurrences > 1:
+            data["occurrences"] = occurrences
+            return data
+
+        # Keep the innermost frames, which are closest to where it was raised.
+        n_omitted = max(0, len(frames) - self.max_frames)
+        data["frames"] = {
+            "#{}".format(n_omitted + i): "{}:{} in {}".format(os.path.basename(file_name), line, function)
+            for i, (file_name, line, function) in enumerate(frames[n_omitted:])
+        }
+        if n_omitted > 0:
+            data["frames_omitted"] = n_omitted
+
+        cause = exc_value.__cause__
+        if cause is None and not exc_value.__suppress_context__:
+            cause = exc_value.__context__
+        if cause is not None:
+            data["cause"] = truncate("{}: {}".format(type(cause).__qualname__, cause), self.max_message_size)
+        return data
+
+    @staticmethod
+    def _extract_frames(exc_traceback) -> list:
+        """ (file, line, function) for each frame, outermost first. Unlike 'traceback', no source is read. """
+        frames = []
+        while exc_traceback is not None:
+            code = exc_traceback.tb_frame.f_code
+            frames.append((code.co_filename, exc_traceback.tb_lineno, code.co_name))
+            exc_traceback = exc_traceback.tb_next
+        return frames
+
+    @staticmethod
+    def _fingerprint(type_name: str, frames: list) -> str:
+        key = "|".join([type_name] + ["{}:{}:{}".format(*frame) for frame in frames])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
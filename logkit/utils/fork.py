@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""
+Keeps logkit objects usable across os.fork(). A forked child only has the thread that forked, but
+it inherits every socket, file, lock and queue of the parent as they were at that moment. Objects
+that hold such state register here, and are given a chance to flush before the fork, and to reopen
+and restart in the child.
+"""
+
+import os
+import weakref
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+# The registered objects. They may implement _before_fork() and _after_fork_in_child().
+_instances = weakref.WeakSet()
+
+
+def register(instance):
+    _instances.add(instance)
+
+
+def _call(method_name: str):
+    for instance in list(_instances):
+        method = getattr(instance, method_name, None)
+        if method is not None:
+            try:
+                method()
+            except Exception:
+                # A fork must never fail because of the logger.
+                pass
+
+
+def before_fork():
+    _call("_before_fork")
+
+
+def after_fork_in_child():
+    _call("_after_fork_in_child")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=before_fork, after_in_child=after_fork_in_child)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cached terminal geometry. The size is looked up once, and again only after the terminal is resized
+(SIGWINCH), instead of on every divider that is written to the console.
+"""
+
+import shutil
+import signal
+import threading
+
+__author__ = "Jakrin Juangbhanich"
+__email__ = "juangbhanich.k@gmail.com"
+
+
+FALLBACK_SIZE = (80, 456)
+
+_size = None
+_previous_handler = None
+_is_watching = False
+
+
+def get_size() -> tuple:
+    """ The (columns, rows) of the terminal. """
+    global _size
+    size = _size
+    if size is None:
+        size = _size = tuple(shutil.get_terminal_size(fallback=FALLBACK_SIZE))
+    return size
+
+
+def invalidate():
+    """ Forget the cached size, so that the next lookup asks the terminal again. """
+    global _size
+    _size = None
+
+
+def _on_resize(signum, frame):
+    invalidate()
+    if callable(_previous_handler):
+        _previous_handler(signum, frame)
+
+
+def watch_resize() -> bool:
+    """ Refresh the cached size when the terminal is resized. Signal handlers can only be set from
+    the main thread, and not every platform has SIGWINCH, so this returns if it is being watched. """
+    global _previous_handler, _is_watching
+    if _is_watching:
+        return True
+
+    if not hasattr(signal, "SIGWINCH") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    _previous_handler = signal.signal(signal.SIGWINCH, _on_resize)
+    _is_watching = True
+    return True
+
+
+def is_terminal(stream) -> bool:
+    """ If this stream is attached to a terminal, rather than a pipe or a file. """
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
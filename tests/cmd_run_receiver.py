@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Runs the reference socket receiver, to help test the socket logger by hand.
+"""
+
+import argparse
+import time
+
+from logkit.receiver import Receiver
+from logkit.socket_logger import SocketLogger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print every record received from a SocketLogger.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--transport", default=SocketLogger.TCP, choices=list(SocketLogger.TRANSPORTS))
+    parser.add_argument("--path", default=None, help="Socket path for the unix transports.")
+    parser.add_argument("--protocol", default=SocketLogger.LINES, choices=[SocketLogger.LINES, SocketLogger.FRAMED])
+    args = parser.parse_args()
+
+    receiver = Receiver(
+        host=args.host,
+        port=args.port,
+        transport=args.transport,
+        path=args.path,
+        protocol=args.protocol,
+        on_record=lambda record: print("Received Data", {"data": record.decode("utf-8", "replace")}),
+        keep_records=False
+    ).start()
+
+    print("Waiting for records on", receiver.address)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
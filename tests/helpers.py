@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from logkit import pulse
+
+
+class FakeSocketLogger:
+    """ Keeps every record that the logger sends to the socket, decoded and without its newline. """
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message.decode("utf-8").rstrip("\n"))
+
+    def send_many(self, messages):
+        for message in messages:
+            self.send(message)
+
+
+def stop_new_pulses(pulses: set):
+    """ Stop every Pulse that isn't in this set of earlier Pulses, so that none of them keep reporting in the
+    background of the other tests. """
+    for p in set(pulse.PULSE_SET) - pulses:
+        p.stop(with_report=False)
+        if pulse.PULSE_MAP.get(p.key) is p:
+            del pulse.PULSE_MAP[p.key]
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+from unittest import TestCase, mock
+from logkit import pulse
+from logkit.anomaly import AnomalyDetector
+
+
+def run(detector, rates, key="errors", total=0, start=0):
+    """ Feed one check per second at these rates. Returns the anomalies and the final total. """
+    anomalies = []
+    for i, rate in enumerate(rates):
+        total += rate
+        anomalies.extend(detector.check([(key, total)], float(start + i)))
+    return anomalies, total
+
+
+class TestAnomaly(TestCase):
+    def test_steady_rate(self):
+        random.seed(7)
+        detector = AnomalyDetector()
+        anomalies, _ = run(detector, [random.randint(5, 15) for _ in range(600)])
+        self.assertEqual(anomalies, [])
+
+    def test_spike(self):
+        detector = AnomalyDetector(factor=3, critical_factor=10)
+        anomalies, total = run(detector, [10] * 40)
+        self.assertEqual(anomalies, [])
+
+        # Reported on the first check of the spike, and only once while it lasts.
+        anomalies, total = run(detector, [60] * 5, total=total, start=40)
+        self.assertEqual(len(anomalies), 1)
+        key, anomaly = anomalies[0]
+        self.assertEqual(key, "errors")
+        self.assertEqual(anomaly["level"], logging.WARNING)
+        self.assertAlmostEqual(anomaly["rate"], 35.0)
+
+        # Escalates to critical.
+        anomalies, total = run(detector, [400], total=total, start=45)
+        self.assertEqual([a["level"] for _, a in anomalies], [logging.CRITICAL])
+
+        # Calms down, and then reports the next spike again.
+        anomalies, total = run(detector, [10] * 20, total=total, start=46)
+        self.assertEqual(anomalies, [])
+        anomalies, total = run(detector, [200], total=total, start=66)
+        self.assertEqual(len(anomalies), 1)
+
+    def test_drop(self):
+        detector = AnomalyDetector(factor=3, critical_factor=10)
+        anomalies, total = run(detector, [30] * 40)
+        self.assertEqual(anomalies, [])
+
+        # A collapse in the rate is reported as a drop, and escalates to critical as the rate reaches 0.
+        anomalies, total = run(detector, [0] * 10, total=total, start=40)
+        self.assertEqual([(a["level"], a["direction"]) for _, a in anomalies],
+                         [(logging.WARNING, "drop"), (logging.CRITICAL, "drop")])
+        self.assertLessEqual(anomalies[0][1]["rate"] * 3, anomalies[0][1]["baseline"])
+
+        # Recovering is not an anomaly, and a spike after a drop is reported as a rise.
+        anomalies, total = run(detector, [30] * 10, total=total, start=50)
+        self.assertEqual(anomalies, [])
+        anomalies, total = run(detector, [300], total=total, start=60)
+        self.assertEqual([a["direction"] for _, a in anomalies], ["rise"])
+
+    def test_quiet_counter_has_no_drop(self):
+        # A baseline below the minimum rate can't drop.
+        detector = AnomalyDetector(min_rate=1)
+        anomalies, _ = run(detector, [0.5] * 40 + [0] * 20)
+        self.assertEqual(anomalies, [])
+
+    def test_new_counter_after_warmup(self):
+        detector = AnomalyDetector(warmup=5)
+        run(detector, [10] * 10, key="requests")
+        anomalies = detector.check([("requests", 110), ("errors", 30)], 10.0)
+        self.assertEqual([(k, a["level"]) for k, a in anomalies], [("errors", logging.CRITICAL)])
+
+        # A quiet new counter is not an anomaly.
+        self.assertEqual(detector.check([("requests", 120), ("errors", 30), ("retries", 1)], 11.0), [])
+
+    def test_pulse_logs_anomaly(self):
+        anomaly_pulse = pulse.Pulse("anomaly")
+        anomaly_pulse.set_anomaly_detection(warmup=5)
+        try:
+            with mock.patch("logkit.pulse.warning") as warning, mock.patch("logkit.pulse.critical") as critical:
+                for i in range(10):
+                    anomaly_pulse.increment("errors", 2, labels={"code": 500})
+                    anomaly_pulse._check_anomalies(float(i))
+                anomaly_pulse.increment("errors", 100, labels={"code": 500})
+                anomaly_pulse._check_anomalies(10.0)
+
+            warning.assert_not_called()
+            message, data = critical.call_args[0]
+            self.assertEqual(message, "Pulse Anomaly")
+            self.assertEqual(data["pulse"], "anomaly")
+            self.assertEqual(data["counter"], "errors")
+            self.assertEqual(data["labels"], "code=500")
+            self.assertEqual(data["direction"], "rise")
+            self.assertGreater(data["rate"], 10 * data["baseline"])
+        finally:
+            anomaly_pulse.stop(with_report=False)
+
+    def test_module_level_options(self):
+        with mock.patch.object(pulse.Pulse, "set_anomaly_detection") as set_anomaly_detection:
+            pulse.set_anomaly_detection(factor=4, alpha=0.1, warmup=5)
+        set_anomaly_detection.assert_called_once_with(4, 10.0, 1.0, 0.1, 5)
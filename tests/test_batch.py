@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import logging
+import sys
+from unittest import TestCase
+from logkit import log
+from logkit.logger import Logger
+from tests.helpers import FakeSocketLogger
+
+
+@contextlib.contextmanager
+def fake_socket_logger():
+    logger = log.get_instance()
+    socket_logger = FakeSocketLogger()
+    logger.socket_logger = socket_logger
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield socket_logger
+    finally:
+        logger.socket_logger = None
+
+
+def strip_time(message):
+    level, _, rest = message.split("::", 2)
+    return "{}::{}".format(level, rest)
+
+
+class TestBatch(TestCase):
+    def test_same_as_single_records(self):
+        records = [
+            (logging.INFO, "Item", {"i": 1, "nested": {"tags": ["a", "b"]}}),
+            (logging.WARNING, "Plain", None),
+            (logging.DEBUG, "Not a dict", [1, 2]),
+            (logging.ERROR, 42, {"i": 2}),
+        ]
+
+        with fake_socket_logger() as socket_logger:
+            for level, message, data in records:
+                log.get_instance().write(message, data, level, module_trace="test_batch:1")
+            log.get_instance().write_many(records, module_trace="test_batch:1")
+
+        singles = socket_logger.messages[:4]
+        batched = socket_logger.messages[4:]
+        self.assertEqual([strip_time(m) for m in batched], [strip_time(m) for m in singles])
+
+    def test_call_site(self):
+        with fake_socket_logger() as socket_logger:
+            line = sys._getframe().f_lineno + 1
+            log.write_many([(logging.INFO, "First", None), (logging.INFO, "Second", None)])
+            with log.batch() as batch:
+                batch.info("Third")
+                batch.error("Fourth", {"i": 4})
+                self.assertEqual(len(socket_logger.messages), 2)
+
+        traces = [m.split("::")[2] for m in socket_logger.messages]
+        self.assertEqual(traces[:2], ["test_batch:{}".format(line)] * 2)
+        self.assertEqual(traces[2], "test_batch:{}".format(line + 1))
+        self.assertEqual([m.split("::")[3] for m in socket_logger.messages], ["First", "Second", "Third", "Fourth"])
+
+    def test_native_records(self):
+        # Without human mode, the native logger gets one LogRecord per record, as it would from single writes.
+        logger = log.get_instance()
+        human_mode = logger.human_mode
+        logger.human_mode = False
+        try:
+            with self.assertLogs("logkit", level=logging.INFO) as logs:
+                logger.write_many([
+                    (logging.INFO, "First", None),
+                    (logging.INFO, "Second", {"i": 2}),
+                    (logging.WARNING, "Third", None),
+                ], module_trace="test_batch:1")
+        finally:
+            logger.human_mode = human_mode
+
+        records = [r for r in logs.records if "test_batch:1" in r.getMessage()]
+        self.assertEqual([r.levelno for r in records], [logging.INFO, logging.INFO, logging.WARNING])
+        self.assertTrue(all("\n" not in r.getMessage() for r in records))
+
+    def test_max_size(self):
+        with fake_socket_logger() as socket_logger:
+            with log.batch(max_size=3) as batch:
+                for i in range(7):
+                    batch.info("Item", {"i": i})
+                self.assertEqual(len(socket_logger.messages), 6)
+                self.assertEqual(len(batch), 1)
+        self.assertEqual(len(socket_logger.messages), 7)
+
+    def test_dumps_many(self):
+        data_list = [{"i": i, "s": "a, b"} for i in range(5)]
+        self.assertEqual(Logger.dumps_many(data_list), [log.get_instance().parse_data("", d)[2] for d in data_list])
+
+        # Data that contains the marker falls back to one dump each.
+        data_list.append({"marker": Logger.BATCH_MARKER})
+        data_list.append({"i": 6})
+        self.assertEqual(len(Logger.dumps_many(data_list)), 7)
+        self.assertIn("logkit-batch", Logger.dumps_many(data_list)[5])
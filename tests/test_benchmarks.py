@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+import tracemalloc
+from unittest import TestCase, mock
+from benchmarks import run
+
+
+class TestBenchmarks(TestCase):
+    def test_benchmarks_run(self):
+        # Run every benchmark once with a handful of operations, to make sure none of them are broken.
+        for name, (func, n) in run.BENCHMARKS.items():
+            result = run.run_benchmark(func, n=10, repeat=1)
+            self.assertGreater(result["best_s"], 0, name)
+            self.assertEqual(result["n"], 10)
+
+    def test_allocations_without_reset_peak(self):
+        # Python 3.6 to 3.8 have no tracemalloc.reset_peak().
+        old_tracemalloc = mock.Mock(wraps=tracemalloc, spec=["start", "stop", "get_traced_memory"])
+        with mock.patch.object(run, "tracemalloc", old_tracemalloc):
+            result = run.measure_allocations(lambda: [0] * 1000, 20)
+        self.assertGreater(result["peak_bytes_per_call"], 0)
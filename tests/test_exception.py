@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import sys
+from unittest import TestCase
+from logkit import log
+from logkit.tracebacks import TracebackCache
+
+
+def recurse(depth):
+    if depth == 0:
+        raise ValueError("x" * 1000)
+    recurse(depth - 1)
+
+
+def capture(cache, func, *args):
+    try:
+        func(*args)
+    except Exception:
+        return cache.capture(sys.exc_info())
+
+
+class TestException(TestCase):
+    def test_repeats_are_counted(self):
+        cache = TracebackCache()
+        first = [capture(cache, recurse, 2) for _ in range(3)]
+
+        self.assertIn("frames", first[0])
+        self.assertNotIn("occurrences", first[0])
+        self.assertEqual(first[1]["occurrences"], 2)
+        self.assertEqual(first[2]["occurrences"], 3)
+        self.assertNotIn("frames", first[2])
+        self.assertEqual(first[0]["fingerprint"], first[2]["fingerprint"])
+
+        # A different stack is a different fingerprint.
+        other = capture(cache, recurse, 3)
+        self.assertIn("frames", other)
+        self.assertNotEqual(other["fingerprint"], first[0]["fingerprint"])
+
+    def test_bounded(self):
+        cache = TracebackCache(max_frames=5, max_message_size=100, max_entries=2)
+        data = capture(cache, recurse, 50)
+        self.assertEqual(len(data["frames"]), 5)
+        self.assertEqual(data["frames_omitted"], 52 - 5)
+        self.assertLessEqual(len(data["message"]), 100 + len(" ... "))
+        self.assertTrue(list(data["frames"].values())[-1].endswith("in recurse"))
+
+        # Only the most recent fingerprints are remembered.
+        for depth in range(3):
+            capture(cache, recurse, depth)
+        self.assertEqual(len(cache.count_map), 2)
+
+    def test_cause(self):
+        cache = TracebackCache()
+
+        def chained():
+            try:
+                {}["missing"]
+            except KeyError as e:
+                raise RuntimeError("Lookup failed") from e
+
+        data = capture(cache, chained)
+        self.assertEqual(data["type"], "RuntimeError")
+        self.assertEqual(data["cause"], "KeyError: 'missing'")
+
+    def test_log_exception(self):
+        logger = log.get_instance()
+        sent = []
+        logger.socket_logger = type("FakeSocketLogger", (), {"send": lambda self, m: sent.append(m)})()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                try:
+                    recurse(1)
+                except ValueError:
+                    log.exception("It broke", {"job": 7})
+        finally:
+            logger.socket_logger = None
+
+        self.assertIn("frames", output.getvalue())
+        level, _, trace, message, data = sent[0].decode("utf-8").rstrip("\n").split("::", 4)
+        self.assertEqual(level, "ERROR")
+        self.assertTrue(trace.startswith("test_exception:"))
+        data = json.loads(data)
+        self.assertEqual(data["job"], 7)
+        self.assertEqual(data["exception"]["type"], "ValueError")
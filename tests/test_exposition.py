@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import time
+import urllib.request
+from unittest import TestCase, mock
+from logkit import exposition, pulse
+from tests.helpers import stop_new_pulses
+
+
+class TestExposition(TestCase):
+    def setUp(self):
+        self.pulses = set(pulse.PULSE_SET)
+
+    def tearDown(self):
+        stop_new_pulses(self.pulses)
+
+    def test_render(self):
+        p = pulse.Pulse("exposition_test")
+        p.increment("detections", 5)
+        p.increment("detections", 2)
+        p.gauge("saline level", 31.5)
+        p.add_collector("queue", lambda: {"depth": 3, "name": "ignored"})
+
+        # Counters keep their totals across beats, and gauges keep their last value.
+        with mock.patch("logkit.pulse.info"):
+            p._execute()
+        p.increment("detections", 1)
+        p.increment("http_requests", labels={"code": 200, "path": '/"x"'})
+
+        text = exposition.render([p])
+        self.assertIn('logkit_http_requests_total{pulse="exposition_test",code="200",path="/\\"x\\""} 1', text)
+        self.assertIn("# TYPE logkit_detections counter", text)
+        self.assertIn('logkit_detections_total{pulse="exposition_test"} 8', text)
+        self.assertIn("# TYPE logkit_saline_level gauge", text)
+        self.assertIn('logkit_saline_level{pulse="exposition_test"} 31.5', text)
+        self.assertIn('logkit_queue_depth{pulse="exposition_test"} 3', text)
+        self.assertNotIn("ignored", text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+    def test_render_many_series(self):
+        p = pulse.Pulse("exposition_many")
+        for i in range(5000):
+            p.increment("series_{}".format(i))
+
+        exposition.render([p])
+        start = time.perf_counter()
+        text = exposition.render([p])
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(text.count("_total{"), 5000)
+
+    def test_caches_hold_live_series(self):
+        p = pulse.Pulse("exposition_cached", max_label_sets=100000)
+        for i in range(300):
+            p.increment("visits", labels={"user": i})
+        text = exposition.render([p])
+        self.assertEqual(text.count("logkit_visits_total{"), 300)
+        self.assertEqual(len(exposition._series_cache), 300)
+
+        # A repeated scrape reuses the cached prefixes, and series that are no longer scraped drop out.
+        prefix = exposition._series_cache[("logkit_visits", "_total", "exposition_cached", pulse.labels(user=0))]
+        exposition.render([p])
+        self.assertIs(exposition._series_cache[("logkit_visits", "_total", "exposition_cached",
+                                                pulse.labels(user=0))], prefix)
+
+        other = pulse.Pulse("exposition_other")
+        other.increment("jobs")
+        exposition.render([other])
+        self.assertEqual(len(exposition._series_cache), 1)
+        self.assertEqual(list(exposition._name_cache), ["jobs"])
+        p.stop(with_report=False)
+        other.stop(with_report=False)
+
+    def test_render_all_pulses(self):
+        # Pulses that are built directly, such as an aggregator, are exposed too.
+        direct = pulse.Pulse("exposition_direct")
+        direct.increment("direct_jobs", 2)
+        self.assertIn('logkit_direct_jobs_total{pulse="exposition_direct"} 2', exposition.render())
+        direct.stop(with_report=False)
+
+    def test_http_server(self):
+        p = pulse.get("exposition_http")
+        p.increment("requests", 3)
+        server = exposition.start_http_server(port=0)
+        only_server = exposition.start_http_server(port=0, pulses=[p])
+        try:
+            url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertEqual(response.headers["Content-Type"], exposition.CONTENT_TYPE)
+                body = response.read().decode("utf-8")
+            url = "http://127.0.0.1:{}/metrics".format(only_server.server_address[1])
+            with urllib.request.urlopen(url, timeout=5) as response:
+                only_body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            only_server.shutdown()
+        self.assertIn('logkit_requests_total{pulse="exposition_http"} 3', body)
+        self.assertEqual(only_body.count("pulse="), 1)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import unittest
+from unittest import TestCase
+from logkit import pulse
+from logkit.pulse_aggregator import PulseAggregator
+from logkit.receiver import Receiver
+from logkit.socket_logger import SocketLogger
+
+
+def run_in_child(target) -> tuple:
+    """ Fork, run the target in the child, and return the child's (pid, exit code). """
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = 0 if target() else 2
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    return pid, os.WEXITSTATUS(status)
+
+
+@unittest.skipUnless(hasattr(os, "register_at_fork"), "No fork on this platform.")
+class TestFork(TestCase):
+    def test_socket_logger(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(*receiver.address)
+        socket_logger.send("parent 1")
+        socket_logger.flush(timeout=5)
+        parent_socket = socket_logger.socket
+
+        # Leave the sender lock held, as if the sender thread was busy when the fork happened.
+        socket_logger.lock.acquire()
+
+        def child():
+            if socket_logger.socket is parent_socket or socket_logger.stats()["records_sent"] != 0:
+                return False
+            socket_logger.send("child")
+            return socket_logger.flush(timeout=5) and socket_logger.stats()["records_sent"] == 1
+
+        try:
+            self.assertEqual(run_in_child(child)[1], 0)
+        finally:
+            socket_logger.lock.release()
+
+        # The parent's connection still works.
+        socket_logger.send("parent 2")
+        socket_logger.flush(timeout=5)
+        self.assertTrue(receiver.wait_for(3))
+        self.assertEqual(sorted(receiver.records), [b"child", b"parent 1", b"parent 2"])
+        self.assertEqual(socket_logger.stats()["records_sent"], 2)
+        receiver.stop()
+
+    def test_pulse(self):
+        aggregator = PulseAggregator("fork_aggregate")
+        worker = pulse.Pulse("fork_worker")
+        worker.set_aggregator(aggregator.address)
+        worker.increment("parent_jobs", 5)
+
+        def child():
+            worker.increment("child_jobs", 1)
+
+            # The restarted loop pushes on its own.
+            time.sleep(worker._interval + pulse.Pulse.SLEEP_INTERVAL * 2)
+            return True
+
+        child_pid, code = run_in_child(child)
+        self.assertEqual(code, 0)
+
+        deadline = time.time() + 5
+        while str(child_pid) not in aggregator.breakdown() and time.time() < deadline:
+            time.sleep(0.05)
+
+        counters = aggregator.breakdown()[str(child_pid)]["counter"]
+        self.assertEqual(counters.get("child_jobs"), 1)
+        self.assertNotIn("parent_jobs", counters)
+
+        # Stop the parent's worker from pushing to the closed aggregator.
+        worker.aggregator_address = None
+        worker.set_interval(pulse.Pulse.MINUTES, 15)
+        aggregator.close()
+
+    def test_aggregator(self):
+        aggregator = PulseAggregator("fork_idle_aggregate")
+        aggregator.increment("jobs", 7)
+        aggregator._merge({"worker": "1", "counter": {"jobs": 3}, "gauge": {}})
+
+        def child():
+            # The parent's interval is the parent's to report, so shutting down in the child reports nothing.
+            reports = []
+            aggregator._execute = lambda: reports.append(True)
+            aggregator.stop()
+            return not aggregator.is_running and not aggregator._has_values() and \
+                aggregator.breakdown() == {} and len(reports) == 0
+
+        _, code = run_in_child(child)
+        self.assertEqual(code, 0)
+        self.assertTrue(aggregator.is_running)
+        self.assertEqual(aggregator.counter_map["jobs"], 7)
+        aggregator.stop(with_report=False)
+        aggregator.close()
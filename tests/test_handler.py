@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import logging
+from unittest import TestCase
+from logkit import log
+from logkit.handler import install, to_logkit_level
+from tests.helpers import FakeSocketLogger
+
+
+class TestHandler(TestCase):
+    def setUp(self):
+        self.logkit_logger = log.get_instance()
+        self.socket_logger = FakeSocketLogger()
+        self.logkit_logger.socket_logger = self.socket_logger
+
+        self.stdlib_logger = logging.getLogger("third_party")
+        self.stdlib_logger.propagate = False
+        self.stdlib_logger.setLevel(logging.DEBUG)
+        self.handler = install(self.stdlib_logger)
+
+    def tearDown(self):
+        self.stdlib_logger.removeHandler(self.handler)
+        self.logkit_logger.socket_logger = None
+
+    def test_bridge(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.stdlib_logger.warning("Hello %s", "World", extra={"user": "rick", "obj": object()})
+
+        self.assertEqual(len(self.socket_logger.messages), 1)
+        level, _, trace, message, data = self.socket_logger.messages[0].split("::")
+        self.assertEqual(level, "WARNING")
+        self.assertTrue(trace.startswith("test_handler:"))
+        self.assertEqual(message, "Hello World")
+        self.assertEqual(json.loads(data)["user"], "rick")
+        self.assertIn("object", json.loads(data)["obj"])
+
+    def test_exception(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                raise ValueError("Bad value")
+            except ValueError:
+                self.stdlib_logger.exception("Failed")
+
+        data = json.loads(self.socket_logger.messages[0].split("::", 4)[4])
+        self.assertEqual(data["exception"]["type"], "ValueError")
+        self.assertEqual(data["exception"]["message"], "Bad value")
+        self.assertTrue(any("in test_exception" in frame for frame in data["exception"]["frames"].values()))
+
+    def test_no_recursion(self):
+        # Records from logkit's own loggers are never fed back in.
+        logging.getLogger("logkit").handlers.append(self.handler)
+        try:
+            self.handler.handle(logging.makeLogRecord({"name": "logkit", "msg": "Internal"}))
+        finally:
+            logging.getLogger("logkit").handlers.remove(self.handler)
+        self.assertEqual(self.socket_logger.messages, [])
+
+    def test_ignored_names(self):
+        for name in ("logkit", "logkit.socket_logger", "logkit_file_logger"):
+            self.handler.handle(logging.makeLogRecord({"name": name, "msg": "Internal"}))
+        self.assertEqual(self.socket_logger.messages, [])
+
+        # Loggers that only share the prefix are not logkit's own.
+        other_logger = logging.getLogger("logkitfoo")
+        other_logger.propagate = False
+        other_handler = install(other_logger)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                other_logger.warning("External")
+        finally:
+            other_logger.removeHandler(other_handler)
+        self.assertEqual(len(self.socket_logger.messages), 1)
+
+    def test_level_mapping(self):
+        self.assertEqual(to_logkit_level(5), logging.DEBUG)
+        self.assertEqual(to_logkit_level(25), logging.INFO)
+        self.assertEqual(to_logkit_level(logging.ERROR), logging.ERROR)
+        self.assertEqual(to_logkit_level(100), logging.CRITICAL)
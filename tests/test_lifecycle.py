@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase, mock
+from logkit import log, lifecycle, pulse
+from logkit.receiver import Receiver
+from logkit.socket_logger import SocketLogger
+
+
+@contextlib.contextmanager
+def socket_logger_state(socket_logger):
+    logger = log.get_instance()
+    saved = logger.socket_logger
+    logger.socket_logger = socket_logger
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield logger
+    finally:
+        logger.socket_logger = saved
+
+
+class TestLifecycle(TestCase):
+    def test_shutdown(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(*receiver.address)
+        final_pulse = pulse.Pulse("final")
+        final_pulse.increment("jobs", 3)
+
+        # Only this test's Pulse is shut down, not the ones that the other tests are using.
+        with socket_logger_state(socket_logger), mock.patch.object(lifecycle, "PULSE_SET", {final_pulse}):
+            for i in range(100):
+                log.info("Record", {"i": i})
+            result = lifecycle.shutdown(timeout=5)
+
+            self.assertEqual(result["records_lost"], 0)
+            self.assertEqual(result["pulses_reported"], 1)
+            self.assertIsNone(socket_logger.socket)
+
+            # Called directly, the Pulse keeps running, and what it counts next is reported next time.
+            self.assertTrue(final_pulse.is_running)
+            self.assertEqual(lifecycle.shutdown(timeout=1)["pulses_reported"], 0)
+            final_pulse.increment("jobs", 2)
+            self.assertEqual(lifecycle.shutdown(timeout=5)["pulses_reported"], 1)
+
+            # At exit, it is stopped for good.
+            final_pulse.increment("jobs", 1)
+            self.assertEqual(lifecycle.shutdown(timeout=5, is_exiting=True)["pulses_reported"], 1)
+            self.assertFalse(final_pulse.is_running)
+
+        records = [r.decode("utf-8") for r in receiver.records]
+        self.assertEqual(sum(1 for r in records if "::Record::" in r), 100)
+        reports = [r for r in records if "Pulse" in r and '"jobs"' in r]
+        self.assertEqual([('"jobs": {}'.format(n) in r) for n, r in zip((3, 2, 1), reports)], [True] * 3)
+        receiver.stop()
+
+    def test_records_lost(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(*receiver.address)
+
+        with mock.patch.object(socket_logger, "send_batch", side_effect=lambda messages: time.sleep(1)):
+            with socket_logger_state(socket_logger):
+                for i in range(10):
+                    log.info("Record", {"i": i})
+                socket_logger.send_many(["Batched {}".format(i) for i in range(1500)])
+                result = lifecycle.shutdown(timeout=0.1)
+
+        # Every record that is still pending is lost, including each one in a batch.
+        self.assertGreaterEqual(result["records_lost"], 1510)
+        receiver.stop()
+
+    @unittest.skipUnless(hasattr(os, "fork") and hasattr(signal, "SIGTERM"), "No fork or SIGTERM on this platform.")
+    def test_sigterm(self):
+        receiver = Receiver().start()
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                logger = log.get_instance()
+                logger.socket_logger = SocketLogger(*receiver.address)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    log.info("Before SIGTERM")
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    time.sleep(5)
+            finally:
+                os._exit(1)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertTrue(os.WIFSIGNALED(status))
+        self.assertEqual(os.WTERMSIG(status), signal.SIGTERM)
+        self.assertTrue(receiver.wait_for(1))
+        self.assertTrue(any(b"::Before SIGTERM::" in r for r in receiver.records))
+        receiver.stop()
+
+    @unittest.skipUnless(hasattr(signal, "SIGTERM"), "No SIGTERM on this platform.")
+    def test_handle_signals_option(self):
+        # The handlers are only set once the config is loaded, and only when the option is on.
+        script = "import signal, logkit; a = signal.getsignal(signal.SIGTERM); logkit.info('Loaded'); " \
+                 "print(a == signal.SIG_DFL, signal.getsignal(signal.SIGTERM) == signal.SIG_DFL)"
+        package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for handle_signals, expected in (("False", "True True"), ("True", "True False")):
+            env = dict(os.environ, PYTHONPATH=package_path, SHUTDOWN__HANDLE_SIGNALS=handle_signals)
+            with tempfile.TemporaryDirectory() as path:
+                output = subprocess.check_output([sys.executable, "-c", script], cwd=path, env=env)
+            self.assertEqual(output.decode("utf-8").strip().splitlines()[-1], expected)
+
+    @unittest.skipUnless(hasattr(signal, "SIGTERM"), "No SIGTERM on this platform.")
+    def test_signal_handler_defers_shutdown(self):
+        # The handler must not take the logger's locks on the interrupted main thread.
+        shutdown_threads = []
+        killed = threading.Event()
+        previous_handler = signal.getsignal(signal.SIGTERM)
+        try:
+            def shutdown(is_exiting=False):
+                self.assertTrue(is_exiting)
+                shutdown_threads.append(threading.current_thread())
+
+            with mock.patch.object(lifecycle, "shutdown", shutdown), \
+                    mock.patch.object(lifecycle.os, "kill", lambda pid, signum: killed.set()):
+                lifecycle._on_signal(signal.SIGTERM, None)
+                self.assertTrue(killed.wait(5))
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+
+        self.assertEqual(len(shutdown_threads), 1)
+        self.assertIsNot(shutdown_threads[0], threading.main_thread())
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+from logkit.profiler import Profiler
+
+
+def busy_work(duration):
+    end = time.time() + duration
+    total = 0
+    while time.time() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestProfiler(TestCase):
+    def test_hot_stack(self):
+        profiler = Profiler(rate_hz=200, report_interval=None).start()
+        busy_work(0.5)
+        profiler.stop()
+
+        self.assertGreater(profiler.n_samples, 20)
+
+        # Other (idle) threads are sampled too, so look for the busy one among the top stacks.
+        busy_samples = sum(count for stack, count in profiler.stacks() if any(":busy_work:" in x for x in stack))
+        self.assertGreater(busy_samples, profiler.n_samples // 2)
+
+        summary = profiler.summary()
+        self.assertEqual(summary["n_samples"], profiler.n_samples)
+        self.assertLessEqual(len(summary["top"]), profiler.top_n)
+
+    def test_collapsed_dump(self):
+        profiler = Profiler(report_interval=None)
+        for _ in range(5):
+            profiler.sample()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.collapsed")
+            profiler.dump(path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+
+        # Each sample counts every thread once, including this one.
+        self.assertGreaterEqual(sum(int(line.rsplit(" ", 1)[1]) for line in lines), 5)
+        self.assertTrue(any("test_collapsed_dump" in line for line in lines))
+
+    def test_report(self):
+        profiler = Profiler(report_interval=None)
+        profiler.sample()
+        with mock.patch("logkit.profiler.info") as info:
+            profiler.report()
+        message, data = info.call_args[0]
+        self.assertEqual(data["n_samples"], 1)
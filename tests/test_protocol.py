@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import zlib
+from unittest import TestCase
+from logkit import protocol
+from logkit.receiver import Receiver
+from logkit.socket_logger import SocketLogger
+
+
+class TestProtocol(TestCase):
+    def test_round_trip(self):
+        records = [b"INFO::first\n", b"WARNING::second\nline\n", b"", b"ERROR::third"]
+        for codec in (protocol.NONE, protocol.ZLIB):
+            frame = protocol.encode_frame(records, sequence=7, codec=codec, ack=True)
+            header, decoded = protocol.decode_frame(frame)
+            self.assertEqual(header.sequence, 7)
+            self.assertEqual(header.codec, codec)
+            self.assertTrue(header.ack)
+            self.assertEqual(decoded, [b"INFO::first", b"WARNING::second\nline", b"", b"ERROR::third"])
+
+    def test_compression(self):
+        records = [b"INFO::2019-05-17T14:01:37+0800::test:1::Hello World!::{}\n"] * 100
+        frame = protocol.encode_frame(records, sequence=1, codec=protocol.ZLIB)
+        self.assertLess(len(frame), len(b"".join(records)) // 10)
+        self.assertEqual(protocol.decode_frame(frame)[1], [r.rstrip(b"\n") for r in records])
+        self.assertEqual(len(zlib.decompress(frame[protocol.HEADER.size:])), len(b"".join(records)) + 300)
+
+    def test_truncated_payload(self):
+        frame = protocol.encode_frame([b"first", b"second"], sequence=1)
+        header = protocol.decode_header(frame[:protocol.HEADER.size])
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode_payload(header, frame[protocol.HEADER.size:-2])
+
+    def test_invalid_frame(self):
+        frame = bytearray(protocol.encode_frame([b"a\n"], sequence=1))
+        frame[0:2] = b"XX"
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode_frame(bytes(frame))
+
+    def test_auto_codec(self):
+        expected = protocol.LZ4 if protocol.lz4 is not None else protocol.ZLIB
+        self.assertEqual(protocol.resolve_codec(protocol.AUTO), expected)
+
+    def test_framed_socket_with_ack(self):
+        receiver = Receiver(protocol=SocketLogger.FRAMED).start()
+        socket_logger = SocketLogger(port=receiver.address[1], protocol=SocketLogger.FRAMED, ack=True, timeout=2)
+
+        for i in range(500):
+            socket_logger.send("Message {}".format(i))
+        self.assertTrue(socket_logger.flush(timeout=5))
+
+        self.assertEqual(socket_logger.records_delivered, 500)
+        self.assertEqual(socket_logger.last_acked_sequence, socket_logger.sequence)
+        self.assertEqual(receiver.records, [bytes("Message {}".format(i), "utf-8") for i in range(500)])
+        self.assertLess(receiver.n_frames, 500)
+
+        socket_logger.close()
+        receiver.stop()
+
+    def test_framed_multi_line_records(self):
+        # A record with newlines of its own stays one record, and the rest of the batch is delivered.
+        receiver = Receiver(protocol=SocketLogger.FRAMED).start()
+        socket_logger = SocketLogger(port=receiver.address[1], protocol=SocketLogger.FRAMED, ack=True, timeout=2)
+        socket_logger.send_many(["Before\n", "a\nb\n", "After\n"])
+        self.assertTrue(socket_logger.flush(timeout=5))
+
+        self.assertEqual(receiver.records, [b"Before", b"a\nb", b"After"])
+        stats = socket_logger.stats()
+        self.assertEqual(stats["records_delivered"], 3)
+        self.assertEqual(stats["records_dropped"], 0)
+        socket_logger.close()
+        receiver.stop()
+
+    def test_framed_datagrams(self):
+        receiver = Receiver(transport=SocketLogger.UDP, protocol=SocketLogger.FRAMED).start()
+        socket_logger = SocketLogger(port=receiver.address[1], transport=SocketLogger.UDP,
+                                     protocol=SocketLogger.FRAMED, compression=protocol.ZLIB)
+        for i in range(100):
+            socket_logger.send("Message {}".format(i))
+
+        self.assertTrue(socket_logger.flush(timeout=5))
+        self.assertTrue(receiver.wait_for(100))
+        self.assertEqual(len(receiver.records), 100)
+
+        socket_logger.close()
+        receiver.stop()
+
+    def test_ack_requires_stream(self):
+        with self.assertRaises(ValueError):
+            SocketLogger(transport=SocketLogger.UDP, protocol=SocketLogger.FRAMED, ack=True)
@@ -1,11 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import sys
 import time
-from unittest import TestCase
+from unittest import TestCase, mock
 from logkit import pulse
+from tests.helpers import stop_new_pulses
 
 
 class TestLogging(TestCase):
+    def setUp(self):
+        self.pulses = set(pulse.PULSE_SET)
+
+    def tearDown(self):
+        # Don't keep beating in the background of the other tests.
+        stop_new_pulses(self.pulses)
+        default_pulse = pulse.PULSE_MAP.get(pulse.DEFAULT_PULSE_KEY)
+        if default_pulse is not None:
+            default_pulse.set_interval(pulse.Pulse.MINUTES, 15)
+
     def test_pulse(self):
         print("Testing Pulse")
         pulse.set_interval("s", 2)
@@ -14,3 +26,53 @@ class TestLogging(TestCase):
         pulse.increment("detections", 5)
         pulse.increment("detections", 5)
         time.sleep(5)
+
+    def test_collector(self):
+        p = pulse.Pulse("collector_test")
+        p.add_collector("queue", lambda: {"depth": 3})
+        p.gauge("latency", 30.4)
+        with mock.patch("logkit.pulse.info") as info:
+            p._execute()
+        message, data = info.call_args[0]
+        self.assertEqual(data["gauge"], {"latency": 30.4, "queue": {"depth": 3}})
+
+    def test_labels(self):
+        p = pulse.Pulse("labels_test")
+        p.increment("http_requests", labels={"code": 200, "path": "/api/x"})
+        p.increment("http_requests", labels={"path": "/api/x", "code": 200})
+        p.increment("http_requests", labels=pulse.labels(code=500, path="/api/x"))
+
+        # Label order does not matter, and label sets are interned.
+        label_set = pulse.labels(path="/api/x", code=200)
+        self.assertIs(label_set, pulse.intern_labels({"code": "200", "path": "/api/x"}))
+        self.assertEqual(p.counter_map[("http_requests", label_set)], 2)
+
+        with mock.patch("logkit.pulse.info") as info:
+            p._execute()
+        message, data = info.call_args[0]
+        self.assertEqual(data["counter"], {"http_requests": {"code=200,path=/api/x": 2, "code=500,path=/api/x": 1}})
+
+    def test_label_cardinality_cap(self):
+        p = pulse.Pulse("cardinality_test", max_label_sets=10)
+        for i in range(100):
+            p.increment("requests", labels={"user": i})
+
+        self.assertEqual(len(p.counter_map), 11)
+        self.assertEqual(p.counter_map[("requests", pulse.OVERFLOW_LABELS)], 90)
+        self.assertEqual(p.memory_usage()["n_overflow"], 90)
+
+        # Series that are already known keep counting.
+        p.increment("requests", labels={"user": 0})
+        self.assertEqual(p.counter_map[("requests", pulse.labels(user=0))], 2)
+
+    def test_overflow_is_not_interned(self):
+        p = pulse.Pulse("intern_test", max_label_sets=10)
+        n_label_sets = len(pulse.LABEL_SET_MAP)
+        for i in range(1000):
+            p.increment("intern_requests", labels={"intern_user": i})
+
+        # Only the admitted label sets are interned, and the intern table counts towards the memory usage.
+        self.assertEqual(len(pulse.LABEL_SET_MAP), n_label_sets + 10)
+        usage = p.memory_usage()
+        self.assertEqual(usage["n_label_sets"], len(pulse.LABEL_SET_MAP))
+        self.assertGreater(usage["bytes"], sys.getsizeof(pulse.LABEL_SET_MAP))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import time
+from unittest import TestCase, mock
+from logkit import pulse
+from logkit.pulse_aggregator import PulseAggregator
+
+
+def run_worker(address, n_detections):
+    worker = pulse.Pulse("worker")
+    worker.set_aggregator(address)
+    worker.increment("detections", n_detections)
+    worker.increment("frames", 1, labels={"camera": "front"})
+    worker.gauge("queue_depth", 2)
+    worker._execute()
+
+
+class TestPulseAggregator(TestCase):
+    def test_aggregation(self):
+        aggregator = PulseAggregator("aggregate", with_breakdown=True)
+        aggregator.increment("detections", 1)
+
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=run_worker, args=(aggregator.address, i + 1)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        # Wait for the aggregator to receive all the pushes.
+        deadline = time.time() + 5
+        while len(aggregator.breakdown()) < 4 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(aggregator.breakdown()), 4)
+
+        with mock.patch("logkit.pulse.info") as info:
+            aggregator._execute()
+        message, data = info.call_args[0]
+
+        self.assertEqual(data["counter"], {"detections": 1 + 1 + 2 + 3 + 4, "frames": {"camera=front": 4}})
+        self.assertEqual(data["gauge"], {"queue_depth": 8})
+        self.assertEqual(data["n_workers"], 4)
+        self.assertEqual(sorted(w["counter"]["detections"] for w in data["workers"].values()), [1, 2, 3, 4])
+
+        # The next interval starts empty.
+        self.assertEqual(aggregator.breakdown(), {})
+        aggregator.close()
+
+    def test_gauges_keep_their_last_value(self):
+        # A gauge that is only set once keeps its value through the worker's 1 second pushes.
+        aggregator = PulseAggregator("aggregate_gauges")
+        worker = pulse.Pulse("gauge_worker")
+        worker.set_aggregator(aggregator.address)
+        try:
+            worker.gauge("queue_depth", 42)
+            time.sleep(3.5)
+
+            self.assertEqual(aggregator.snapshot()[1]["queue_depth"], 42)
+            with mock.patch("logkit.pulse.info") as info:
+                aggregator._execute()
+            message, data = info.call_args[0]
+            self.assertEqual(data["gauge"]["queue_depth"], 42)
+        finally:
+            worker.stop(with_report=False)
+            aggregator.stop(with_report=False)
+            aggregator.close()
+
+    def test_per_worker_gauges(self):
+        aggregator = PulseAggregator("aggregate_per_worker")
+        for worker_id, backoff in (("1", 2), ("2", 8)):
+            aggregator._merge({"worker": worker_id, "counter": {}, "gauge": {
+                "queue_depth": 3, "socket_logger": {"backoff": backoff}
+            }})
+
+        # The logger's own health is reported per worker, not added up.
+        gauges = aggregator.snapshot()[1]
+        self.assertEqual(gauges["queue_depth"], 6)
+        self.assertEqual(gauges["socket_logger"], {"1": {"backoff": 2}, "2": {"backoff": 8}})
+
+        with mock.patch("logkit.pulse.info") as info:
+            aggregator._execute()
+        message, data = info.call_args[0]
+        self.assertEqual(data["gauge"]["socket_logger"], {"1": {"backoff": 2}, "2": {"backoff": 8}})
+        aggregator.stop(with_report=False)
+        aggregator.close()
+
+    def test_pushed_label_cap(self):
+        aggregator = PulseAggregator("aggregate_cap")
+        aggregator.max_label_sets = 5
+        n_label_sets = len(pulse.LABEL_SET_MAP)
+
+        counters = {("pushed_requests", (("pushed_user", str(i)),)): 1 for i in range(100)}
+        aggregator._merge({"worker": "1", "counter": pulse.encode_series(counters), "gauge": {}})
+
+        self.assertEqual(len(pulse.LABEL_SET_MAP), n_label_sets + 5)
+        self.assertEqual(aggregator.counter_total_map[("pushed_requests", pulse.OVERFLOW_LABELS)], 95)
+        self.assertEqual(len(aggregator.counter_total_map), 6)
+        aggregator.stop(with_report=False)
+        aggregator.close()
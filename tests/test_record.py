@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from unittest import TestCase
+from logkit import record
+from logkit.record import Record
+
+
+class TestRecord(TestCase):
+    def test_record_line(self):
+        r = Record(logging.WARNING, "Hello", "test_record:10", '{"a": 1}')
+        self.assertEqual(r.body, 'test_record:10::Hello::{"a": 1}')
+        self.assertEqual(r.line, "WARNING::{}::{}".format(r.timestamp, r.body))
+        self.assertEqual(r.encoded, (r.line + "\n").encode("utf-8"))
+
+        # Without trace or data.
+        r = Record(logging.INFO, "Hello")
+        self.assertEqual(r.body, "Hello::{}")
+
+    def test_line_is_formatted_once(self):
+        r = Record(logging.INFO, "Hello")
+        self.assertIs(r.line, r.line)
+        self.assertIs(r.encoded, r.encoded)
+
+    def test_timestamp_memoized_per_second(self):
+        now = int(time.time())
+        first = record.format_timestamp(now + 0.1)
+        second = record.format_timestamp(now + 0.9)
+        self.assertIs(first, second)
+        self.assertEqual(first, time.strftime(record.ISO_TIME_FMT, time.localtime(now)))
+        self.assertNotEqual(first, record.format_timestamp(now + 3600.5))
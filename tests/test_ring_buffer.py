@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import logging
+from unittest import TestCase
+from logkit import log
+from logkit.ring_buffer import RingBuffer
+from tests.helpers import FakeSocketLogger
+
+
+class TestRingBuffer(TestCase):
+    def test_wrap_around(self):
+        ring_buffer = RingBuffer(size=3)
+        for i in range(5):
+            ring_buffer.append(logging.DEBUG, "Message {}".format(i), None, "test:1", float(i))
+
+        self.assertEqual(len(ring_buffer), 3)
+        self.assertEqual([r[1] for r in ring_buffer.drain()], ["Message 2", "Message 3", "Message 4"])
+        self.assertEqual(ring_buffer.drain(), [])
+
+    def test_flush_on_error(self):
+        logger = log.get_instance()
+        socket_logger = FakeSocketLogger()
+        logger.socket_logger = socket_logger
+        logger.ring_buffer = RingBuffer(size=5, trigger_level=logging.ERROR)
+        file_log_level = logger.file_log_level
+        logger.file_log_level = logging.INFO
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(10):
+                    log.debug("Debug {}".format(i), {"i": i})
+                self.assertEqual(socket_logger.messages, [])
+
+                log.info("Shipped as usual")
+                self.assertEqual(len(socket_logger.messages), 1)
+
+                log.error("Something broke")
+        finally:
+            logger.socket_logger = None
+            logger.ring_buffer = None
+            logger.file_log_level = file_log_level
+
+        messages = [m.split("::")[3] for m in socket_logger.messages[1:]]
+        self.assertEqual(messages, ["Debug {}".format(i) for i in range(5, 10)] + ["Something broke"])
+        self.assertTrue(socket_logger.messages[1].startswith("DEBUG::"))
+        self.assertTrue(socket_logger.messages[1].endswith('{"i": 5}'))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import logging
+import os
+import tempfile
+from unittest import TestCase
+from logkit import log, handler
+from logkit.routing import Router, DEFAULT_ROUTE, parse_rules
+from tests.helpers import FakeSocketLogger
+
+
+def read_messages(path):
+    with open(path) as f:
+        return [line.split("::")[3] for line in f.read().splitlines()]
+
+
+class TestRouting(TestCase):
+    def test_parse_errors(self):
+        for rules in ("ERROR", "LOUD>drop", "ERROR>", "*@>drop", "*>drop,socket"):
+            with self.assertRaises(ValueError):
+                parse_rules(rules)
+
+    def test_first_match(self):
+        router = Router(parse_rules("*@app.db>drop; ERROR+>default,socket; DEBUG@app>console; *@app>file"), str)
+
+        self.assertTrue(router.route(logging.INFO, "app.db.pool").is_dropped)
+        self.assertTrue(router.route(logging.ERROR, "app.db").is_dropped)
+        self.assertTrue(router.route(logging.ERROR, "app").is_default)
+        self.assertFalse(router.route(logging.ERROR, "app").socket)
+        self.assertTrue(router.route(logging.DEBUG, "app.web").console)
+        self.assertTrue(router.route(logging.INFO, "app.web").file)
+        self.assertFalse(router.route(logging.INFO, "application").file)
+        self.assertIs(router.route(logging.INFO, "other"), DEFAULT_ROUTE)
+
+        # Looked up once per module and level, then cached.
+        self.assertIs(router.route(logging.INFO, "app.web"), router.route_cache_map[logging.INFO]["app.web"])
+
+    def test_routes(self):
+        logger = log.get_instance()
+        socket_logger = FakeSocketLogger()
+        saved = (logger.router, logger.socket_logger, logger.console_log_level)
+
+        with tempfile.TemporaryDirectory() as directory:
+            error_path = os.path.join(directory, "error.log")
+            debug_path = os.path.join(directory, "debug.log")
+            rules = "ERROR+>default,{};*@noisy>drop;DEBUG>{}".format(error_path, debug_path)
+            logger.router = Router(parse_rules(rules), logger._create_file_sink)
+            logger.socket_logger = socket_logger
+            logger.console_log_level = logging.INFO
+            noisy_handler = handler.install(logging.getLogger("noisy.library"))
+
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    log.debug("Debug only")
+                    log.info("As usual")
+                    log.error("Everywhere")
+                    logging.getLogger("noisy.library").warning("Dropped")
+            finally:
+                for file_sink in logger.router.sinks:
+                    file_sink.close()
+                logging.getLogger("noisy.library").removeHandler(noisy_handler)
+                logger.router, logger.socket_logger, logger.console_log_level = saved
+
+            self.assertEqual(read_messages(debug_path), ["Debug only"])
+            self.assertEqual(read_messages(error_path), ["Everywhere"])
+
+        self.assertEqual([m.split("::")[3] for m in socket_logger.messages], ["As usual", "Everywhere"])
+        self.assertNotIn("Debug only", output.getvalue())
+        self.assertNotIn("Dropped", output.getvalue())
+        self.assertIn("Everywhere", output.getvalue())
+
+    def test_write_many_routes_on_module(self):
+        logger = log.get_instance()
+        saved = logger.router
+
+        # The trace holds only 'pool', so the batch must be routed on the module's full name.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "routed.log")
+            logger.router = Router(parse_rules("*@app.db>drop;*>{}".format(path)), logger._create_file_sink)
+            try:
+                exec("logger.write_many([(logging.INFO, 'From the pool', None)])",
+                     {"__name__": "app.db.pool", "logger": logger, "logging": logging})
+                logger.write_many([(logging.INFO, "From the test", None)])
+            finally:
+                for file_sink in logger.router.sinks:
+                    file_sink.close()
+                logger.router = saved
+
+            self.assertEqual(read_messages(path), ["From the test"])
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+from unittest import TestCase
+from logkit import log
+from logkit.receiver import Receiver
+from logkit.self_metrics import Histogram, SelfMetrics
+from logkit.socket_logger import SocketLogger
+
+
+class TestSelfMetrics(TestCase):
+    def test_histogram(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.observe(3e-6)
+        histogram.observe(0.5)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 100)
+        self.assertAlmostEqual(snapshot["p50_us"], 5.0)
+        self.assertAlmostEqual(snapshot["p99_us"], 5.0)
+        self.assertAlmostEqual(snapshot["max_us"], 500000.0)
+
+    def test_logger_metrics(self):
+        logger = log.get_instance()
+        self.assertIsNone(log.get_self_metrics())
+
+        logger.self_metrics = SelfMetrics()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(10):
+                    log.info("Measured", {"i": i})
+                log.debug("Below the console level")
+            snapshot = log.get_self_metrics()
+        finally:
+            logger.self_metrics = None
+
+        # The debug record is below every sink's level, so it is skipped before any measurement.
+        self.assertEqual(snapshot["serialize"]["count"], 10)
+        self.assertEqual(snapshot["capture"]["count"], 10)
+        self.assertEqual(snapshot["sink"]["console"]["records"], 10)
+        self.assertGreater(snapshot["sink"]["console"]["latency"]["mean_us"], 0)
+
+    def test_socket_send_metrics(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(port=receiver.address[1])
+        metrics = socket_logger.self_metrics = SelfMetrics()
+
+        # Hold the socket lock while queueing, so the records are sent in a few batches.
+        with socket_logger.lock:
+            for i in range(50):
+                socket_logger.send("Message {}".format(i))
+        self.assertTrue(socket_logger.flush(timeout=5))
+        socket_logger.close()
+        receiver.stop()
+
+        # The send is timed on the sender thread, once per batch.
+        socket = metrics.snapshot()["sink"]["socket"]
+        self.assertEqual(socket["records"], 50)
+        self.assertEqual(socket["bytes"], sum(len("Message {}\n".format(i)) for i in range(50)))
+        self.assertGreaterEqual(socket["batch_latency"]["count"], 1)
+        self.assertLess(socket["batch_latency"]["count"], 50)
+        self.assertEqual(socket["latency"]["count"], socket["batch_latency"]["count"])
+        self.assertGreater(socket["batch_latency"]["max_us"], 0)
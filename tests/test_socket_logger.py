@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 import logging
+import os
 import random
+import socket
+import tempfile
+import threading
 import time
-from unittest import TestCase
+from unittest import TestCase, skipUnless
 from logkit import log
+from logkit.receiver import Receiver
+from logkit.socket_logger import SocketLogger
 
 
 class TestSocketLogger(TestCase):
@@ -13,3 +19,198 @@ class TestSocketLogger(TestCase):
         for i in range(100):
             log.info("Hello World", i)
             time.sleep(0.1)
+
+
+class TestSocketTransports(TestCase):
+
+    @staticmethod
+    def receive_stream(server, received):
+        connection, _ = server.accept()
+        with connection:
+            while True:
+                data = connection.recv(4096)
+                if not data:
+                    break
+                received.append(data)
+
+    @staticmethod
+    def receive_datagrams(server, received):
+        while True:
+            try:
+                received.append(server.recv(65536))
+            except OSError:
+                break
+
+    def check_transport(self, server, socket_logger, is_datagram):
+        received = []
+        target = self.receive_datagrams if is_datagram else self.receive_stream
+        thread = threading.Thread(target=target, args=(server, received), daemon=True)
+        thread.start()
+
+        # Hold the socket lock while queueing, so the messages pile up into batches.
+        with socket_logger.lock:
+            for i in range(200):
+                socket_logger.send("Message {}".format(i))
+        self.assertTrue(socket_logger.flush(timeout=5))
+        socket_logger.close()
+
+        # Stream receivers end on close, datagram receivers once the socket times out.
+        thread.join(timeout=5)
+        server.close()
+
+        lines = b"".join(received).decode("utf-8").splitlines()
+        self.assertEqual(lines, ["Message {}".format(i) for i in range(200)])
+
+        # Messages are batched, so there should be far fewer packets than messages.
+        if is_datagram:
+            self.assertLess(len(received), 200)
+
+    def test_tcp(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        socket_logger = SocketLogger(port=server.getsockname()[1], transport=SocketLogger.TCP, timeout=2)
+        self.assertEqual(socket_logger.socket.gettimeout(), 2)
+        self.check_transport(server, socket_logger, is_datagram=False)
+
+    def test_udp(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(0.5)
+        socket_logger = SocketLogger(port=server.getsockname()[1], transport=SocketLogger.UDP)
+        self.check_transport(server, socket_logger, is_datagram=True)
+
+    @skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are not available.")
+    def test_unix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "logkit.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+            server.listen(1)
+            socket_logger = SocketLogger(path=path, transport=SocketLogger.UNIX)
+            self.check_transport(server, socket_logger, is_datagram=False)
+
+    @skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are not available.")
+    def test_unix_dgram(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "logkit.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            server.bind(path)
+            server.settimeout(0.5)
+            socket_logger = SocketLogger(path=path, transport=SocketLogger.UNIX_DGRAM)
+            self.check_transport(server, socket_logger, is_datagram=True)
+
+    def test_oversized_datagram(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(0.5)
+        socket_logger = SocketLogger(port=server.getsockname()[1], transport=SocketLogger.UDP)
+
+        # Only the record that is too large for a datagram is dropped, and the socket stays up.
+        with self.assertLogs("logkit.socket_logger", level=logging.WARNING):
+            socket_logger.send_batch(["Before", "x" * 70000, "After"])
+        received = []
+        self.receive_datagrams(server, received)
+        server.close()
+
+        self.assertEqual(b"".join(received).decode("utf-8").splitlines(), ["Before", "After"])
+        stats = socket_logger.stats()
+        self.assertEqual(stats["records_sent"], 2)
+        self.assertEqual(stats["records_dropped"], 1)
+        self.assertTrue(stats["is_connected"])
+        self.assertEqual(stats["backoff"], 0)
+        socket_logger.close()
+
+    def test_default_timeout_untouched(self):
+        SocketLogger(port=1, timeout=3)
+        self.assertIsNone(socket.getdefaulttimeout())
+
+
+class TestSocketFlowControl(TestCase):
+    def test_stats(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(port=receiver.address[1])
+        for i in range(50):
+            socket_logger.send("Message {}".format(i))
+        self.assertTrue(socket_logger.flush(timeout=5))
+
+        stats = socket_logger.stats()
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["records_sent"], 50)
+        self.assertEqual(stats["bytes_sent"], sum(len("Message {}\n".format(i)) for i in range(50)))
+        self.assertEqual(stats["records_dropped"], 0)
+        self.assertTrue(stats["is_connected"])
+        socket_logger.close()
+        receiver.stop()
+
+    def test_send_many(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(port=receiver.address[1])
+        socket_logger.send("Single")
+        socket_logger.send_many(["Message {}".format(i) for i in range(50)])
+        self.assertTrue(socket_logger.flush(timeout=5))
+        self.assertTrue(receiver.wait_for(51))
+
+        self.assertEqual(receiver.records, [b"Single"] + ["Message {}".format(i).encode("utf-8") for i in range(50)])
+        self.assertEqual(socket_logger.stats()["records_sent"], 51)
+        socket_logger.close()
+        receiver.stop()
+
+    def test_queue_bounds_records(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(port=receiver.address[1], max_queue_size=100)
+
+        # Hold the sender thread, so that everything stays queued.
+        release = threading.Event()
+        send_batch = socket_logger.send_batch
+        socket_logger.send_batch = lambda messages: release.wait(5) and send_batch(messages)
+
+        with self.assertLogs("logkit.socket_logger", level=logging.WARNING):
+            socket_logger.send_many(["Message {}".format(i) for i in range(60)])
+            socket_logger.send_many(["Message {}".format(i) for i in range(60, 1500)])
+            socket_logger.send("Single")
+
+        stats = socket_logger.stats()
+        self.assertEqual(stats["queue_depth"], 100)
+        self.assertEqual(stats["records_dropped"], 1401)
+        self.assertFalse(socket_logger.flush(timeout=0.1))
+
+        release.set()
+        self.assertTrue(socket_logger.flush(timeout=5))
+        self.assertTrue(receiver.wait_for(100))
+        self.assertEqual(receiver.records[-1], b"Message 99")
+        self.assertEqual(socket_logger.stats()["queue_depth"], 0)
+        socket_logger.close()
+        receiver.stop()
+
+    def test_drops_are_counted_and_warnings_rate_limited(self):
+        # Nothing is listening on this port, so the logger backs off and drops everything.
+        with self.assertLogs("logkit.socket_logger", level=logging.WARNING) as logs:
+            socket_logger = SocketLogger(port=1, timeout=1)
+            for i in range(100):
+                socket_logger.send("Message {}".format(i))
+
+        self.assertEqual(socket_logger.stats()["records_dropped"], 100)
+        backoff_warnings = [line for line in logs.output if "backing off" in line]
+        self.assertEqual(len(backoff_warnings), 1)
+
+    def test_jittered_backoff(self):
+        socket_logger = SocketLogger(port=1, timeout=1)
+        for _ in range(10):
+            socket_logger.backoff()
+            limit = min(socket_logger.max_back_off, 2 ** socket_logger.n_failures)
+            self.assertGreaterEqual(socket_logger.current_backoff, limit / 2)
+            self.assertLessEqual(socket_logger.current_backoff, limit)
+
+    def test_reconnect_latency(self):
+        receiver = Receiver().start()
+        socket_logger = SocketLogger(port=receiver.address[1])
+        socket_logger.close()
+        socket_logger.backoff()
+        socket_logger.connect()
+
+        stats = socket_logger.stats()
+        self.assertEqual(stats["reconnects"], 1)
+        self.assertIsNotNone(stats["reconnect_latency"])
+        socket_logger.close()
+        receiver.stop()
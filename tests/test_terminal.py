@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+import signal
+import unittest
+from unittest import TestCase, mock
+from logkit import log
+from logkit.utils import terminal
+
+
+class TestTerminal(TestCase):
+    def test_size_is_cached(self):
+        terminal.invalidate()
+        with mock.patch("shutil.get_terminal_size", return_value=os.terminal_size((100, 40))) as get_terminal_size:
+            for _ in range(10):
+                self.assertEqual(terminal.get_size(), (100, 40))
+            self.assertEqual(get_terminal_size.call_count, 1)
+
+            terminal.invalidate()
+            terminal.get_size()
+            self.assertEqual(get_terminal_size.call_count, 2)
+        terminal.invalidate()
+
+    @unittest.skipUnless(hasattr(signal, "SIGWINCH"), "No SIGWINCH on this platform.")
+    def test_resize_refreshes_size(self):
+        self.assertTrue(terminal.watch_resize())
+        with mock.patch("shutil.get_terminal_size", side_effect=[os.terminal_size((100, 40)),
+                                                                 os.terminal_size((120, 40))]):
+            terminal.invalidate()
+            self.assertEqual(terminal.get_size(), (100, 40))
+            os.kill(os.getpid(), signal.SIGWINCH)
+            self.assertEqual(terminal.get_size(), (120, 40))
+        terminal.invalidate()
+
+    def test_is_terminal(self):
+        self.assertFalse(terminal.is_terminal(io.StringIO()))
+        self.assertFalse(terminal.is_terminal(object()))
+
+    def test_plain_output(self):
+        logger = log.get_instance()
+        saved = (logger.human_mode, logger.with_color, logger.with_box, logger.last_bar_time)
+        logger.human_mode = True
+        logger.with_color = False
+        logger.set_box(False)
+        logger.last_bar_time = None
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                log.info("Plain", {"a": {"b": 1}, "c": 2})
+                log.info("Plain again")
+        finally:
+            logger.human_mode, logger.with_color, _, logger.last_bar_time = saved
+            logger.set_box(saved[2])
+
+        text = output.getvalue()
+        self.assertNotIn("\33[", text)
+        self.assertTrue(all(ord(c) < 128 for c in text), text)
+
+        # Only one time bar within the interval.
+        lines = text.splitlines()
+        self.assertTrue(lines[0].startswith("|---"))
+        self.assertEqual(sum(1 for line in lines if line.startswith("|---")), 1)
+        self.assertIn("|    `-- c: 2", lines)
+
+    def test_set_box(self):
+        logger = log.get_instance()
+        with_box = logger.with_box
+        try:
+            logger.set_box(False)
+            self.assertEqual(logger.BOX_STEM, "|")
+            logger.set_box(True)
+            self.assertEqual(logger.BOX_STEM, "├")
+        finally:
+            logger.set_box(with_box)